@@ -0,0 +1,85 @@
+from copy import copy
+from hashlib import sha256
+
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from rest_framework.authentication import (TokenAuthentication,
+                                           get_authorization_header)
+from rest_framework.authtoken.models import Token
+
+from api.cache import LRUCache
+
+
+class TokenCache(LRUCache):
+    """Кеш токенов, чтобы не читать токен и пользователя из БД.
+
+    Удаление токена, выход, блокировка пользователя и смена пароля
+    очищают кеш через delete и delete_user.
+    """
+
+    SHARED_CACHE_KEY = 'auth_token:{digest}'
+
+    def shared_key(self, key):
+        return self.SHARED_CACHE_KEY.format(
+            digest=sha256(key.encode()).hexdigest()
+        )
+
+    def delete_user(self, user_id):
+        with self._lock:
+            keys = {
+                key for key, (token, _) in self._entries.items()
+                if token.user_id == user_id
+            }
+        if self.use_shared_cache:
+            keys.update(
+                Token.objects.filter(user_id=user_id).values_list(
+                    'key', flat=True
+                )
+            )
+        self.delete(*keys)
+
+
+token_cache = TokenCache(
+    max_size=settings.AUTH_TOKEN_CACHE['MAX_SIZE'],
+    timeout=settings.AUTH_TOKEN_CACHE['TIMEOUT'],
+    local_timeout=settings.AUTH_TOKEN_CACHE['LOCAL_TIMEOUT'],
+    use_shared_cache=settings.AUTH_TOKEN_CACHE['USE_SHARED_CACHE'],
+)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication без запроса к БД для недавно виденных токенов.
+
+    Каждый запрос получает свою копию пользователя, чтобы изменения в одном
+    запросе не попадали в кеш.
+    """
+
+    def authenticate_credentials(self, key):
+        token = token_cache.get(key)
+        if token is None:
+            user, token = super().authenticate_credentials(key)
+            token_cache.set(key, token)
+        return copy(token.user), token
+
+
+async def aauthenticate(request):
+    """Пользователь запроса для асинхронных view по кешу токенов.
+
+    Возвращает None, если токена нет в кеше или заголовок неверный: такой
+    запрос передаётся синхронному view, где его проверит
+    CachedTokenAuthentication.
+    """
+    auth = get_authorization_header(request).split()
+    keyword = CachedTokenAuthentication.keyword.lower().encode()
+    if not auth or auth[0].lower() != keyword:
+        return AnonymousUser()
+    if len(auth) != 2:
+        return None
+    try:
+        key = auth[1].decode()
+    except UnicodeError:
+        return None
+    token = await token_cache.aget(key)
+    if token is None:
+        return None
+    return copy(token.user)
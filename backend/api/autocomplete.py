@@ -0,0 +1,158 @@
+from bisect import bisect_left
+from collections import defaultdict
+from threading import Lock
+
+from asgiref.sync import sync_to_async
+
+from api.cache import aget_catalog_version, get_catalog_version
+from backend.db_routers import primary_reads
+from recipes.models import Ingredient
+
+FUZZY_MIN_LENGTH = 3
+FUZZY_MAX_PREFIX_MATCHES = 10
+HEAD_LENGTH = 32
+
+
+def split_query(query, parts):
+    """Делит запрос на parts непрерывных частей с их смещениями.
+
+    Каждая правка затрагивает не больше одной части, а нетронутые части
+    сдвигаются не больше чем на число правок. Поэтому при parts - 2 правках
+    хотя бы две части находятся в названии на своих местах, и большинство
+    названий отсеивается без подсчёта расстояния.
+    """
+    size, rest = divmod(len(query), parts)
+    pieces, start = [], 0
+    for index in range(parts):
+        end = start + size + (index < rest)
+        pieces.append((start, query[start:end]))
+        start = end
+    return pieces
+
+
+def prefix_distance(query, name, max_distance):
+    """Расстояние Левенштейна от query до ближайшего префикса name.
+
+    Считаются только клетки в полосе шириной max_distance вокруг диагонали.
+    Возвращает None, если расстояние больше max_distance.
+    """
+    name = name[:len(query) + max_distance]
+    limit = max_distance + 1
+    previous = [
+        column if column <= max_distance else limit
+        for column in range(len(name) + 1)
+    ]
+    for row, query_char in enumerate(query, start=1):
+        current = [limit] * (len(name) + 1)
+        if row <= max_distance:
+            current[0] = row
+        first = max(row - max_distance, 1)
+        last = min(row + max_distance, len(name))
+        for column in range(first, last + 1):
+            current[column] = min(
+                previous[column] + 1,
+                current[column - 1] + 1,
+                previous[column - 1] + (query_char != name[column - 1]),
+                limit,
+            )
+        if min(current) > max_distance:
+            return None
+        previous = current
+    distance = min(previous)
+    if distance > max_distance:
+        return None
+    return distance
+
+
+class IngredientIndex:
+    """Каталог ингредиентов в памяти процесса для автодополнения.
+
+    Названия хранятся отсортированными, поэтому поиск по префиксу сводится
+    к двоичному поиску. Если совпадений по префиксу мало, к результатам
+    добавляются нечёткие совпадения, отсортированные по расстоянию.
+    Каталог перечитывается, когда меняется его версия в кеше.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._catalog = None
+        self._version = None
+
+    def load(self, version):
+        with primary_reads():
+            items = sorted(
+                Ingredient.objects.values('id', 'name', 'measurement_unit'),
+                key=lambda item: (item['name'].casefold(), item['id']),
+            )
+        keys = [item['name'].casefold() for item in items]
+        chars = defaultdict(list)
+        for position, key in enumerate(keys):
+            for offset, char in enumerate(key[:HEAD_LENGTH]):
+                chars[offset, char].append(position)
+        catalog = (keys, items, chars)
+        with self._lock:
+            self._catalog, self._version = catalog, version
+        return catalog
+
+    def get_current(self, version):
+        with self._lock:
+            if self._version == version:
+                return self._catalog
+        return None
+
+    def search(self, query):
+        version = get_catalog_version()
+        catalog = self.get_current(version) or self.load(version)
+        return self.lookup(catalog, query)
+
+    async def asearch(self, query):
+        """Асинхронный поиск: в поток уходит только перечитывание."""
+        version = await aget_catalog_version()
+        catalog = self.get_current(version)
+        if catalog is None:
+            catalog = await sync_to_async(self.load)(version)
+        return self.lookup(catalog, query)
+
+    def lookup(self, catalog, query):
+        keys, items, chars = catalog
+        query = query.strip().casefold()
+        start = bisect_left(keys, query)
+        end = start
+        while end < len(keys) and keys[end].startswith(query):
+            end += 1
+        results = items[start:end]
+
+        if (
+            len(query) < FUZZY_MIN_LENGTH
+            or len(results) >= FUZZY_MAX_PREFIX_MATCHES
+        ):
+            return results
+        max_distance = 1 if len(query) < 8 else 2
+        matches = defaultdict(set)
+        for shift, piece in split_query(query, max_distance + 2):
+            for offset in range(
+                max(shift - max_distance, 0), shift + max_distance + 1
+            ):
+                for position in chars.get((offset, piece[0]), ()):
+                    if keys[position].startswith(piece, offset):
+                        matches[position].add(shift)
+        candidates = [
+            position for position, shifts in matches.items()
+            if len(shifts) >= 2
+        ]
+        head_length = len(query) + max_distance
+        distances = {}
+        fuzzy = []
+        for position in candidates:
+            if start <= position < end:
+                continue
+            head = keys[position][:head_length]
+            if head not in distances:
+                distances[head] = prefix_distance(query, head, max_distance)
+            distance = distances[head]
+            if distance is not None:
+                fuzzy.append((distance, position))
+        return results + [items[position] for _, position in sorted(fuzzy)]
+
+
+ingredient_index = IngredientIndex()
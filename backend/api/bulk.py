@@ -0,0 +1,151 @@
+import base64
+import json
+import mimetypes
+from itertools import islice
+
+from django.db import transaction
+
+from api.fields import IMAGE_FORMAT
+from api.serializers import RecipePostSerializer
+from recipes.counters import update_counter
+from recipes.images import schedule_thumbnails
+from recipes.matching import recipe_match_index
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from recipes.search import update_search_vectors
+
+BULK_CHUNK_SIZE = 200
+EXPORT_CHUNK_SIZE = 500
+
+
+def get_ingredient_ids(row):
+    ingredients = row.get('ingredients')
+    if not isinstance(ingredients, list):
+        return
+    for ingredient in ingredients:
+        if isinstance(ingredient, dict):
+            try:
+                yield int(ingredient.get('id'))
+            except (TypeError, ValueError):
+                continue
+
+
+def import_recipes(rows, request):
+    """Проверяет и создаёт рецепты из строк NDJSON частями.
+
+    Ингредиенты и теги каждой части загружаются одним запросом и
+    передаются сериализатору в context['preloaded']. Рецепты части
+    создаются через bulk_create в отдельной транзакции. Сигналы при этом
+    не отправляются, поэтому счётчики, индексы и миниатюры обновляются
+    здесь же.
+
+    Возвращает количество созданных рецептов и ошибки по строкам.
+    """
+    tags = Tag.objects.in_bulk()
+    created, errors = 0, []
+    rows = iter(rows)
+    while True:
+        chunk = list(islice(rows, BULK_CHUNK_SIZE))
+        if not chunk:
+            break
+        ingredient_ids = set()
+        for _, row, _ in chunk:
+            if isinstance(row, dict):
+                ingredient_ids.update(get_ingredient_ids(row))
+        context = {
+            'request': request,
+            'preloaded': {
+                Ingredient: Ingredient.objects.in_bulk(ingredient_ids),
+                Tag: tags,
+            },
+        }
+        valid = []
+        for line_number, row, error in chunk:
+            if error is None and not isinstance(row, dict):
+                error = 'Ожидается объект JSON.'
+            if error is not None:
+                errors.append({'line': line_number, 'errors': error})
+                continue
+            serializer = RecipePostSerializer(data=row, context=context)
+            if serializer.is_valid():
+                valid.append(serializer.validated_data)
+            else:
+                errors.append(
+                    {'line': line_number, 'errors': serializer.errors}
+                )
+        if valid:
+            created += len(create_recipes(valid))
+    return created, errors
+
+
+def create_recipes(items):
+    recipes = []
+    with transaction.atomic():
+        for item in items:
+            item = dict(item)
+            item.pop('ingredients')
+            item.pop('tags')
+            recipes.append(Recipe(**item))
+        recipes = Recipe.objects.bulk_create(recipes)
+        recipe_ingredients, recipe_tags = [], []
+        for recipe, item in zip(recipes, items):
+            for ingredient in item['ingredients']:
+                recipe_ingredients.append(
+                    RecipeIngredient(
+                        recipe=recipe,
+                        ingredient=ingredient['id'],
+                        amount=ingredient['amount'],
+                    )
+                )
+            for tag in item['tags']:
+                recipe_tags.append(
+                    Recipe.tags.through(recipe=recipe, tag=tag)
+                )
+        RecipeIngredient.objects.bulk_create(recipe_ingredients)
+        Recipe.tags.through.objects.bulk_create(recipe_tags)
+        update_counter(Recipe, recipes[0], len(recipes))
+        update_search_vectors(recipes)
+        for recipe in recipes:
+            schedule_thumbnails(recipe)
+        recipe_match_index.schedule(*(recipe.id for recipe in recipes))
+    return recipes
+
+
+def encode_image(image):
+    """Возвращает изображение как data URI в base64, как при импорте."""
+    content_type = (
+        mimetypes.guess_type(image.name)[0] or f'image/{IMAGE_FORMAT.lower()}'
+    )
+    try:
+        with image.open('rb') as file:
+            data = base64.b64encode(file.read()).decode()
+    except FileNotFoundError:
+        return None
+    return f'data:{content_type};base64,{data}'
+
+
+def export_recipes(queryset):
+    """Отдаёт рецепты строками NDJSON в формате импорта.
+
+    Изображение передаётся в base64, поэтому выгрузку можно загрузить
+    обратно в этот или другой экземпляр сервиса. Рецепт без файла
+    изображения выгружается с image: null.
+    """
+    recipes = queryset.prefetch_related('tags', 'recipeingredient_set')
+    for recipe in recipes.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        yield json.dumps(
+            {
+                'name': recipe.name,
+                'text': recipe.text,
+                'cooking_time': recipe.cooking_time,
+                'image': encode_image(recipe.image),
+                'tags': [tag.id for tag in recipe.tags.all()],
+                'ingredients': [
+                    {
+                        'id': recipe_ingredient.ingredient_id,
+                        'amount': recipe_ingredient.amount,
+                    }
+                    for recipe_ingredient in recipe.recipeingredient_set.all()
+                ],
+            },
+            ensure_ascii=False,
+        ) + '\n'
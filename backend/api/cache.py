@@ -0,0 +1,162 @@
+import time
+from collections import OrderedDict
+from hashlib import md5
+from threading import Lock
+
+from django.core.cache import cache
+from django.utils.http import urlencode
+
+CATALOG_VERSION_KEY = 'catalog_version'
+CATALOG_RESPONSE_KEY = 'catalog_response:{version}:{digest}'
+CATALOG_CACHE_TIMEOUT = 60 * 60 * 24
+RECIPE_VERSION_KEY = 'recipe_version:{pk}'
+AUTHOR_VERSION_KEY = 'author_version:{pk}'
+
+
+def get_catalog_version():
+    return cache.get_or_set(
+        CATALOG_VERSION_KEY, lambda: time.time_ns(), timeout=None
+    )
+
+
+async def aget_catalog_version():
+    return await cache.aget_or_set(
+        CATALOG_VERSION_KEY, lambda: time.time_ns(), timeout=None
+    )
+
+
+def bump_version(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), timeout=None)
+
+
+def get_versions(keys):
+    """Возвращает версии по ключам, заводя новые для отсутствующих."""
+    versions = cache.get_many(keys)
+    missing = {
+        key: time.time_ns() for key in keys if key not in versions
+    }
+    if missing:
+        cache.set_many(missing, timeout=None)
+    return versions | missing
+
+
+def bump_catalog_version():
+    bump_version(CATALOG_VERSION_KEY)
+
+
+def get_catalog_response_key(request):
+    query = urlencode(sorted(request.query_params.lists()), doseq=True)
+    digest = md5(
+        f'{request.accepted_media_type}:{request.path}?{query}'.encode(),
+        usedforsecurity=False,
+    ).hexdigest()
+    return CATALOG_RESPONSE_KEY.format(
+        version=get_catalog_version(), digest=digest
+    )
+
+
+class LRUCache:
+    """Ограниченный LRU-кеш в памяти процесса с временем жизни записей.
+
+    Если включено, записи дублируются в общем кеше Django на timeout, а
+    промахи локального кеша ищутся в нём. Удаление очищает локальный кеш
+    только своего процесса и общий кеш, поэтому локальная запись живёт
+    local_timeout — несколько секунд, после которых остальные процессы
+    перечитывают её из общего кеша. Счётчики hits и misses показывают
+    долю запросов без обращения к БД.
+    """
+
+    SHARED_CACHE_KEY = None
+
+    def __init__(
+        self, max_size, timeout, local_timeout, use_shared_cache=False
+    ):
+        self.max_size = max_size
+        self.timeout = timeout
+        self.local_timeout = min(local_timeout, timeout)
+        self.use_shared_cache = use_shared_cache
+        self.hits = 0
+        self.misses = 0
+        self._lock = Lock()
+        self._entries = OrderedDict()
+
+    def shared_key(self, key):
+        return self.SHARED_CACHE_KEY.format(key=key)
+
+    def get_local(self, key):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            self._entries.pop(key, None)
+        return None
+
+    def set_local(self, key, value):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + self.local_timeout)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def remember(self, key, value):
+        """Учитывает результат поиска в общем кеше."""
+        with self._lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if value is not None:
+            self.set_local(key, value)
+        return value
+
+    def get(self, key):
+        value = self.get_local(key)
+        if value is not None:
+            return value
+        if self.use_shared_cache:
+            value = cache.get(self.shared_key(key))
+        return self.remember(key, value)
+
+    async def aget(self, key):
+        value = self.get_local(key)
+        if value is not None:
+            return value
+        if self.use_shared_cache:
+            value = await cache.aget(self.shared_key(key))
+        return self.remember(key, value)
+
+    def set(self, key, value):
+        self.set_local(key, value)
+        if self.use_shared_cache:
+            cache.set(self.shared_key(key), value, self.timeout)
+
+    async def aset(self, key, value):
+        self.set_local(key, value)
+        if self.use_shared_cache:
+            await cache.aset(self.shared_key(key), value, self.timeout)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+        if self.use_shared_cache:
+            cache.delete_many([self.shared_key(key) for key in keys])
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._entries),
+            }
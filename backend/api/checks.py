@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.core.checks import Warning, register
+
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register()
+def check_shared_cache(app_configs, **kwargs):
+    """Версии каталога, рецептов и индексов хранятся в кеше по умолчанию.
+
+    С кешем в памяти процесса изменения, сделанные одним воркером или
+    командой управления, не видны остальным воркерам.
+    """
+    if settings.CACHES['default']['BACKEND'] not in PROCESS_LOCAL_CACHES:
+        return []
+    return [
+        Warning(
+            'Кеш по умолчанию не общий для процессов: воркеры будут '
+            'отдавать устаревший каталог и рецепты.',
+            hint='Задайте CACHE_URL с адресом Redis.',
+            id='api.W001',
+        )
+    ]
@@ -1,13 +1,228 @@
-import base64
+import binascii
+from io import BytesIO
+from tempfile import SpooledTemporaryFile
 
 from django.core.files.base import ContentFile
-from rest_framework.serializers import ImageField
+from PIL import Image, ImageOps
+from rest_framework.relations import MANY_RELATION_KWARGS, ManyRelatedField
+from rest_framework.serializers import (ImageField, ListSerializer,
+                                        PrimaryKeyRelatedField,
+                                        ValidationError)
+
+BASE64_CHUNK_SIZE = 64 * 1024
+SPOOL_MAX_SIZE = 1024 * 1024
+MAX_IMAGE_SIDE = 6000
+MAX_IMAGE_PIXELS = 24_000_000
+MAX_IMAGE_SIZE = 10 * 1024 * 1024
+IMAGE_FORMAT = 'WEBP'
+IMAGE_QUALITY = 85
 
 
 class Base64ImageField(ImageField):
+    """Принимает изображение в base64 и сохраняет его в WebP.
+
+    Размер данных проверяется до декодирования, размеры и число пикселей
+    проверяются по заголовку до полной загрузки изображения. Данные
+    декодируются частями во временный файл, EXIF не переносится.
+    Повреждённые файлы отклоняются ошибкой invalid_image.
+    """
+
+    default_error_messages = {
+        'too_large': (
+            'Изображение не должно быть больше '
+            '{max_side}×{max_side} пикселей.'
+        ),
+        'too_many_pixels': (
+            'Изображение не должно быть больше {max_pixels} пикселей.'
+        ),
+        'file_too_large': (
+            'Размер изображения не должен превышать {max_size} МБ.'
+        ),
+    }
+
     def to_internal_value(self, data):
         if isinstance(data, str) and data.startswith('data:image'):
-            format, imgstr = data.split(';base64,')
-            ext = format.split('/')[-1]
-            data = ContentFile(base64.b64decode(imgstr), name='temp.' + ext)
+            _, separator, imgstr = data.partition(';base64,')
+            if not separator:
+                self.fail('invalid_image')
+            if len(imgstr) // 4 * 3 > MAX_IMAGE_SIZE:
+                self.fail(
+                    'file_too_large', max_size=MAX_IMAGE_SIZE // 1024 // 1024
+                )
+            data = self.reencode(self.decode(imgstr))
+        return super().to_internal_value(data)
+
+    def decode(self, imgstr):
+        file = SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+        rest = ''
+        try:
+            for start in range(0, len(imgstr), BASE64_CHUNK_SIZE):
+                # Base64 с переносами строк (MIME) тоже корректен, поэтому
+                # пробельные символы убираются, а неполная четвёрка
+                # символов переносится в следующую часть.
+                chunk = rest + ''.join(
+                    imgstr[start:start + BASE64_CHUNK_SIZE].split()
+                )
+                end = len(chunk) - len(chunk) % 4
+                file.write(binascii.a2b_base64(chunk[:end]))
+                rest = chunk[end:]
+            if rest:
+                file.write(binascii.a2b_base64(rest))
+        except binascii.Error:
+            file.close()
+            self.fail('invalid_image')
+        file.seek(0)
+        return file
+
+    def reencode(self, file):
+        with file:
+            try:
+                output = self.convert(file)
+            except (OSError, SyntaxError, Image.DecompressionBombError):
+                # Обрезанные и повреждённые файлы обнаруживаются только
+                # при загрузке пикселей, уже после Image.open().
+                self.fail('invalid_image')
+        return ContentFile(
+            output.getvalue(), name=f'image.{IMAGE_FORMAT.lower()}'
+        )
+
+    def convert(self, file):
+        image = Image.open(file)
+        width, height = image.size
+        if max(width, height) > MAX_IMAGE_SIDE:
+            self.fail('too_large', max_side=MAX_IMAGE_SIDE)
+        if width * height > MAX_IMAGE_PIXELS:
+            self.fail('too_many_pixels', max_pixels=MAX_IMAGE_PIXELS)
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'RGBA'):
+            has_alpha = (
+                image.mode in ('LA', 'PA') or 'transparency' in image.info
+            )
+            image = image.convert('RGBA' if has_alpha else 'RGB')
+        output = BytesIO()
+        image.save(output, IMAGE_FORMAT, quality=IMAGE_QUALITY)
+        return output
+
+
+def to_pk(value):
+    """Значение как целый pk или None, если это не число."""
+    if isinstance(value, bool):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def preload_objects(context, queryset, values):
+    """Загружает объекты по pk одним in_bulk() в context['preloaded'].
+
+    Словарь модели, уже переданный в контексте, считается полным и
+    повторно не запрашивается.
+    """
+    preloaded = context.setdefault('preloaded', {})
+    if queryset.model not in preloaded:
+        pks = {to_pk(value) for value in values} - {None}
+        preloaded[queryset.model] = queryset.in_bulk(pks)
+    return preloaded[queryset.model]
+
+
+class PreloadedPrimaryKeyRelatedField(PrimaryKeyRelatedField):
+    """Ищет объект в context['preloaded'][модель], если он загружен.
+
+    С many=True все pk списка загружаются одним запросом, а ненайденные
+    значения перечисляются в одной ошибке.
+    """
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return PreloadedManyRelatedField(**list_kwargs)
+
+    def to_internal_value(self, data):
+        preloaded = self.context.get('preloaded', {}).get(
+            self.get_queryset().model
+        )
+        if preloaded is None:
+            return super().to_internal_value(data)
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return preloaded[int(data)]
+        except KeyError:
+            self.fail('does_not_exist', pk_value=data, pk_values=data)
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+
+class PreloadedManyRelatedField(ManyRelatedField):
+    default_error_messages = {
+        'does_not_exist': (
+            'Недопустимые первичные ключи {pk_values} - '
+            'объекты не существуют.'
+        ),
+    }
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+        preload_objects(
+            self.context, self.child_relation.get_queryset(), data
+        )
+        values, missing = [], []
+        for item in data:
+            try:
+                values.append(self.child_relation.to_internal_value(item))
+            except ValidationError as error:
+                if error.get_codes() != ['does_not_exist']:
+                    raise
+                missing.append(str(item))
+        if missing:
+            self.fail('does_not_exist', pk_values=', '.join(missing))
+        return values
+
+
+class PreloadedListSerializer(ListSerializer):
+    """Загружает объекты PreloadedPrimaryKeyRelatedField всех элементов.
+
+    На каждое такое поле дочернего сериализатора выполняется один запрос
+    вместо запроса на каждый элемент списка, а ненайденные значения
+    перечисляются в одной ошибке списка.
+    """
+
+    default_error_messages = {
+        'does_not_exist': PreloadedManyRelatedField.default_error_messages[
+            'does_not_exist'
+        ],
+    }
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            missing = []
+            for field in self.child.fields.values():
+                if field.read_only or not isinstance(
+                    field, PreloadedPrimaryKeyRelatedField
+                ):
+                    continue
+                values = [
+                    item.get(field.field_name)
+                    for item in data
+                    if isinstance(item, dict)
+                ]
+                objects = preload_objects(
+                    self.context, field.get_queryset(), values
+                )
+                missing.extend(
+                    str(value)
+                    for value in values
+                    if to_pk(value) is not None
+                    and to_pk(value) not in objects
+                )
+            if missing:
+                self.fail('does_not_exist', pk_values=', '.join(missing))
         return super().to_internal_value(data)
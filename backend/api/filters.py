@@ -1,7 +1,10 @@
+from django.db.models import F
 from django_filters.rest_framework import (BooleanFilter, CharFilter,
-                                           FilterSet, NumberFilter)
+                                           ChoiceFilter, FilterSet,
+                                           NumberFilter)
 
 from recipes.models import Ingredient, Recipe
+from recipes.search import search_recipes
 
 
 class IngredientFilter(FilterSet):
@@ -17,10 +20,22 @@ class RecipeFilter(FilterSet):
     tags = CharFilter(method='get_tags')
     is_in_shopping_cart = BooleanFilter(method='get_is_in_shopping_cart')
     is_favorited = BooleanFilter(method='get_is_favorited')
+    search = CharFilter(method='get_search')
+    ordering = ChoiceFilter(
+        choices=(('popular', 'popular'), ('trending', 'trending')),
+        method='get_ordering',
+    )
 
     class Meta:
         model = Recipe
-        fields = ('author', 'tags', 'is_in_shopping_cart', 'is_favorited')
+        fields = (
+            'author',
+            'tags',
+            'is_in_shopping_cart',
+            'is_favorited',
+            'search',
+            'ordering',
+        )
 
     def get_is_in_shopping_cart(self, queryset, name, value):
         user = self.request.user
@@ -37,3 +52,11 @@ class RecipeFilter(FilterSet):
     def get_tags(self, queryset, name, value):
         tag_slugs = self.request.query_params.getlist('tags')
         return queryset.filter(tags__slug__in=tag_slugs).distinct()
+
+    def get_search(self, queryset, name, value):
+        return search_recipes(queryset, value)
+
+    def get_ordering(self, queryset, name, value):
+        return queryset.order_by(
+            F(f'rank__{value}').desc(nulls_last=True), '-id'
+        )
@@ -0,0 +1,72 @@
+from hashlib import md5
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+
+from api.cache import (AUTHOR_VERSION_KEY, RECIPE_VERSION_KEY,
+                       get_catalog_version, get_versions)
+from backend.db_routers import primary_reads
+from recipes.models import Recipe, get_related_lookups
+
+FRAGMENT_KEY = 'recipe_fragment:{catalog}:{recipe}:{author}:{digest}'
+FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 24
+
+
+def get_recipe_fragments(serializer, recipes):
+    """Возвращает {id рецепта: общая для всех зрителей часть ответа}.
+
+    Фрагменты ищутся в кеше одним запросом. Ключ включает версии рецепта,
+    автора и каталога, которые повышаются сигналами, и адрес сайта, от
+    которого зависят ссылки на изображения. Для промахов рецепты
+    с автором и связанными объектами перечитываются из основной базы,
+    чтобы не закрепить в кеше данные отстающей реплики, и фрагменты
+    строятся заново.
+    """
+    request = serializer.context.get('request')
+    site = request.build_absolute_uri('/') if request is not None else ''
+    digest = md5(site.encode(), usedforsecurity=False).hexdigest()
+    recipe_keys = {
+        recipe.pk: RECIPE_VERSION_KEY.format(pk=recipe.pk)
+        for recipe in recipes
+    }
+    author_keys = {
+        recipe.author_id: AUTHOR_VERSION_KEY.format(pk=recipe.author_id)
+        for recipe in recipes
+    }
+    versions = get_versions(
+        list(recipe_keys.values()) + list(author_keys.values())
+    )
+    catalog = get_catalog_version()
+    keys = {
+        recipe.pk: FRAGMENT_KEY.format(
+            catalog=catalog,
+            recipe=versions[recipe_keys[recipe.pk]],
+            author=versions[author_keys[recipe.author_id]],
+            digest=digest,
+        )
+        for recipe in recipes
+    }
+    cached = cache.get_many(keys.values())
+    fragments, missed = {}, []
+    for recipe in recipes:
+        if keys[recipe.pk] in cached:
+            fragments[recipe.pk] = cached[keys[recipe.pk]]
+        else:
+            missed.append(recipe)
+    if missed:
+        built = {}
+        with primary_reads():
+            # Признаки зрителя во фрагмент не входят, поэтому они
+            # вычисляются для анонима без запросов к базе.
+            fresh = (
+                Recipe.objects.with_user_flags(AnonymousUser())
+                .prefetch_related(*get_related_lookups())
+                .in_bulk([recipe.pk for recipe in missed])
+            )
+            for recipe in missed:
+                fragments[recipe.pk] = serializer.build_fragment(
+                    fresh.get(recipe.pk, recipe)
+                )
+                built[keys[recipe.pk]] = fragments[recipe.pk]
+        cache.set_many(built, FRAGMENT_CACHE_TIMEOUT)
+    return fragments
@@ -0,0 +1,58 @@
+from collections import namedtuple
+
+from django.core.cache import cache
+
+from recipes.models import Favorite, ShoppingCart
+from users.models import Subscription
+
+INTERACTIONS_CACHE_KEY = 'user_interactions:{user_id}'
+INTERACTIONS_CACHE_TIMEOUT = 60 * 15
+
+UserInteractions = namedtuple(
+    'UserInteractions', ('favorites', 'shopping_cart', 'subscriptions')
+)
+
+EMPTY_INTERACTIONS = UserInteractions(frozenset(), frozenset(), frozenset())
+
+
+def load_user_interactions(user):
+    return UserInteractions(
+        favorites=frozenset(
+            Favorite.objects.filter(user=user).values_list(
+                'recipe_id', flat=True
+            )
+        ),
+        shopping_cart=frozenset(
+            ShoppingCart.objects.filter(user=user).values_list(
+                'recipe_id', flat=True
+            )
+        ),
+        subscriptions=frozenset(
+            Subscription.objects.filter(user=user).values_list(
+                'author_id', flat=True
+            )
+        ),
+    )
+
+
+def get_user_interactions(request):
+    """Избранное, корзина и подписки текущего пользователя.
+
+    Загружаются один раз за запрос и хранятся в кеше до первого изменения.
+    """
+    user = request.user
+    if not user.is_authenticated:
+        return EMPTY_INTERACTIONS
+    interactions = getattr(request, '_user_interactions', None)
+    if interactions is None:
+        key = INTERACTIONS_CACHE_KEY.format(user_id=user.pk)
+        interactions = cache.get(key)
+        if interactions is None:
+            interactions = load_user_interactions(user)
+            cache.set(key, interactions, INTERACTIONS_CACHE_TIMEOUT)
+        request._user_interactions = interactions
+    return interactions
+
+
+def invalidate_user_interactions(user_id):
+    cache.delete(INTERACTIONS_CACHE_KEY.format(user_id=user_id))
@@ -0,0 +1,83 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.core.signals import request_finished, request_started
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнение времени работы с БД за запрос: новое соединение '
+        'на каждый запрос и постоянное соединение с проверкой.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database',
+            default=DEFAULT_DB_ALIAS,
+            choices=tuple(settings.DATABASES),
+            help='Псевдоним базы данных.',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=200,
+            help='Количество имитируемых запросов для каждого режима.',
+        )
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError('--repeat должен быть больше нуля.')
+        connection = connections[options['database']]
+        original = connection.settings_dict.copy()
+        try:
+            results = {
+                name: self.measure(connection, options['repeat'], **params)
+                for name, params in (
+                    (
+                        'Новое соединение',
+                        {'max_age': 0, 'health_checks': False},
+                    ),
+                    (
+                        'Постоянное соединение',
+                        {
+                            'max_age': original['CONN_MAX_AGE'] or 60,
+                            'health_checks': True,
+                        },
+                    ),
+                )
+            }
+        finally:
+            connection.close()
+            connection.settings_dict.update(original)
+        for name, elapsed in results.items():
+            self.stdout.write(
+                f'{name}: {elapsed * 1000 / options["repeat"]:.3f} мс '
+                'на запрос.'
+            )
+        fresh, persistent = results.values()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Постоянные соединения быстрее в '
+                f'{fresh / persistent:.1f} раза.'
+            )
+        )
+
+    def measure(self, connection, repeat, max_age, health_checks):
+        """Имитирует цикл запросов с одним SQL-запросом в каждом.
+
+        Соединения закрываются и проверяются так же, как при обработке
+        HTTP-запроса: по сигналам request_started и request_finished.
+        """
+        connection.close()
+        connection.settings_dict.update(
+            CONN_MAX_AGE=max_age, CONN_HEALTH_CHECKS=health_checks
+        )
+        started = time.perf_counter()
+        for _ in range(repeat):
+            request_started.send(sender=self.__class__)
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            request_finished.send(sender=self.__class__)
+        return time.perf_counter() - started
@@ -0,0 +1,70 @@
+import time
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.test import RequestFactory
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from api import renderers
+from api.pagination import LimitPageNumberPagination
+from api.renderers import FastJSONRenderer
+from api.serializers import RecipeGetSerializer
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнение скорости JSONRenderer и FastJSONRenderer '
+        'на странице списка рецептов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--limit',
+            type=int,
+            default=LimitPageNumberPagination.page_size,
+            help='Количество рецептов на странице.',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=1000,
+            help='Количество повторов для каждого рендерера.',
+        )
+
+    def handle(self, *args, **options):
+        request = Request(RequestFactory().get('/api/recipes/'))
+        request.user = AnonymousUser()
+        recipes = Recipe.objects.with_user_flags(request.user)[
+            :options['limit']
+        ]
+        if not recipes:
+            raise CommandError('В базе нет рецептов для замера.')
+        data = {
+            'count': len(recipes),
+            'next': None,
+            'previous': None,
+            'results': RecipeGetSerializer(
+                recipes, many=True, context={'request': request}
+            ).data,
+        }
+        backend = 'orjson' if renderers.orjson is not None else 'json'
+        results = {}
+        for name, renderer in (
+            ('JSONRenderer', JSONRenderer()),
+            (f'FastJSONRenderer ({backend})', FastJSONRenderer()),
+        ):
+            started = time.perf_counter()
+            for _ in range(options['repeat']):
+                content = renderer.render(data)
+            elapsed = time.perf_counter() - started
+            results[name] = elapsed
+            self.stdout.write(
+                f'{name}: {elapsed / options["repeat"] * 1e6:.1f} мкс '
+                f'на страницу, {len(content)} байт.'
+            )
+        baseline, fast = results.values()
+        self.stdout.write(
+            self.style.SUCCESS(f'Ускорение: {baseline / fast:.1f}×.')
+        )
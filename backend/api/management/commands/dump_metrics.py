@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from api.metrics import registry, render_prometheus
+
+
+class Command(BaseCommand):
+    help = (
+        'Вывод показателей запросов к API в формате Prometheus. '
+        'Данные процессов сервера видны только при общем кеше Django.'
+    )
+
+    def handle(self, *args, **options):
+        self.stdout.write(render_prometheus(registry.collect()), ending='')
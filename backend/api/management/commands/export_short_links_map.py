@@ -0,0 +1,77 @@
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import F
+
+from api.shortlinks import RECIPE_PAGE_URL
+from recipes.models import LegacyShortLink, Recipe
+from recipes.shortlinks import encode_short_link
+
+MAP_LINE = '/s/{link}/ {url};\n'
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгрузка коротких ссылок в файл для map в nginx, чтобы '
+        'перенаправлять их без обращения к бэкенду. После выгрузки '
+        'выполните nginx -s reload.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--output',
+            help='Файл для записи. По умолчанию вывод в stdout.',
+        )
+        parser.add_argument(
+            '--limit',
+            type=int,
+            help='Выгрузить только столько самых популярных рецептов.',
+        )
+
+    def handle(self, *args, **options):
+        if options['limit'] is not None and options['limit'] < 1:
+            raise CommandError('--limit должен быть больше нуля.')
+        recipe_ids = Recipe.objects.order_by(
+            F('rank__popular').desc(nulls_last=True), '-favorites_count', '-id'
+        ).values_list('pk', flat=True)
+        legacy_links = LegacyShortLink.objects.values_list('link', 'recipe_id')
+        if options['limit'] is not None:
+            recipe_ids = list(recipe_ids[:options['limit']])
+            legacy_links = legacy_links.filter(recipe_id__in=recipe_ids)
+        links = self.get_links(recipe_ids, legacy_links)
+        if options['output'] is None:
+            self.write_map(sys.stdout, links)
+            return
+        path = Path(options['output'])
+        # Файл заменяется целиком, чтобы nginx не прочитал его наполовину.
+        descriptor, temp_path = tempfile.mkstemp(
+            dir=path.parent, prefix=f'.{path.name}.'
+        )
+        try:
+            with os.fdopen(descriptor, 'w', encoding='utf-8') as file:
+                count = self.write_map(file, links)
+            os.chmod(temp_path, 0o644)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        self.stdout.write(
+            self.style.SUCCESS(f'Выгружено ссылок: {count} в {path}.')
+        )
+
+    def get_links(self, recipe_ids, legacy_links):
+        for pk in recipe_ids:
+            yield encode_short_link(pk), pk
+        yield from legacy_links
+
+    def write_map(self, file, links):
+        count = 0
+        for link, pk in links:
+            file.write(
+                MAP_LINE.format(link=link, url=RECIPE_PAGE_URL.format(pk=pk))
+            )
+            count += 1
+        return count
@@ -0,0 +1,151 @@
+import http.client
+import statistics
+import threading
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.models import Recipe
+
+DEFAULT_TARGETS = (
+    'wsgi=http://127.0.0.1:8000',
+    'asgi=http://127.0.0.1:8001',
+)
+
+
+def get_default_paths():
+    """Пути для нагрузки: список, рецепт, автодополнение и короткая ссылка."""
+    paths = ['/api/recipes/', '/api/ingredients/?name=%D0%BC']
+    recipe = Recipe.objects.only('pk').first()
+    if recipe is not None:
+        paths += [f'/api/recipes/{recipe.pk}/', f'/s/{recipe.short_link}/']
+    return paths
+
+
+class Worker(threading.Thread):
+    """Отправляет запросы по кругу через одно keep-alive соединение."""
+
+    def __init__(self, url, paths, deadline):
+        super().__init__(daemon=True)
+        self.url = url
+        self.paths = paths
+        self.deadline = deadline
+        self.latencies = []
+        self.errors = 0
+
+    def connect(self):
+        connection_class = (
+            http.client.HTTPSConnection
+            if self.url.scheme == 'https'
+            else http.client.HTTPConnection
+        )
+        return connection_class(self.url.netloc, timeout=10)
+
+    def run(self):
+        connection = self.connect()
+        index = 0
+        while time.monotonic() < self.deadline:
+            path = self.paths[index % len(self.paths)]
+            index += 1
+            started = time.perf_counter()
+            try:
+                connection.request('GET', path)
+                response = connection.getresponse()
+                response.read()
+            except (OSError, http.client.HTTPException):
+                self.errors += 1
+                connection.close()
+                connection = self.connect()
+                continue
+            self.latencies.append(time.perf_counter() - started)
+            if response.status >= 400:
+                self.errors += 1
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнение производительности WSGI и ASGI серверов: '
+        'запросов в секунду и задержки ответов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--target',
+            action='append',
+            metavar='NAME=URL',
+            help=(
+                'Сервер для проверки, можно указать несколько раз. '
+                f'По умолчанию: {", ".join(DEFAULT_TARGETS)}.'
+            ),
+        )
+        parser.add_argument(
+            '--path',
+            action='append',
+            help=(
+                'Путь запроса, можно указать несколько раз. По умолчанию '
+                'список и страница рецепта, автодополнение ингредиентов '
+                'и короткая ссылка.'
+            ),
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=16,
+            help='Количество одновременных соединений.',
+        )
+        parser.add_argument(
+            '--duration',
+            type=float,
+            default=10,
+            help='Длительность нагрузки на каждый сервер в секундах.',
+        )
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1:
+            raise CommandError('--concurrency должен быть больше нуля.')
+        if options['duration'] <= 0:
+            raise CommandError('--duration должен быть больше нуля.')
+        targets = []
+        for target in options['target'] or DEFAULT_TARGETS:
+            name, sep, url = target.partition('=')
+            if not sep or not urlsplit(url).netloc:
+                raise CommandError(f'Некорректный сервер: {target}.')
+            targets.append((name, urlsplit(url)))
+        paths = options['path'] or get_default_paths()
+        for name, url in targets:
+            self.run_target(name, url, paths, options)
+
+    def run_target(self, name, url, paths, options):
+        deadline = time.monotonic() + options['duration']
+        workers = [
+            Worker(url, paths, deadline)
+            for _ in range(options['concurrency'])
+        ]
+        started = time.monotonic()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.monotonic() - started
+        latencies = sorted(
+            latency for worker in workers for latency in worker.latencies
+        )
+        errors = sum(worker.errors for worker in workers)
+        if len(latencies) < 2:
+            self.stderr.write(
+                self.style.ERROR(f'{name}: сервер {url.netloc} не отвечает.')
+            )
+            return
+        p50, p95, p99 = (
+            statistics.quantiles(latencies, n=100)[index] * 1000
+            for index in (49, 94, 98)
+        )
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'{name}: {len(latencies) / elapsed:.0f} запросов/с, '
+                f'ошибок {errors}, задержка p50 {p50:.1f} мс, '
+                f'p95 {p95:.1f} мс, p99 {p99:.1f} мс.'
+            )
+        )
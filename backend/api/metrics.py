@@ -0,0 +1,425 @@
+import os
+import re
+import socket
+import time
+from collections import Counter
+from contextvars import ContextVar
+from threading import Lock
+
+from asgiref.sync import (iscoroutinefunction, markcoroutinefunction,
+                          sync_to_async)
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+
+SLOT_SECONDS = 60
+FLUSH_INTERVAL = 10
+TOP_DUPLICATES = 5
+WORKERS_KEY = 'request_metrics:workers'
+WORKER_KEY = 'request_metrics:{worker}'
+METRIC_PREFIX = 'foodgram_'
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (1024, 10 * 1024, 100 * 1024, 1024 * 1024)
+HISTOGRAMS = {
+    'request_duration_seconds': (
+        DURATION_BUCKETS, 'Время обработки запроса.'
+    ),
+    'db_duration_seconds': (DURATION_BUCKETS, 'Время SQL-запросов.'),
+    'serialize_duration_seconds': (
+        DURATION_BUCKETS, 'Время view и сериализаторов без SQL.'
+    ),
+    'render_duration_seconds': (DURATION_BUCKETS, 'Время рендеринга ответа.'),
+    'db_queries': (QUERY_BUCKETS, 'Количество SQL-запросов.'),
+    'duplicate_queries': (
+        QUERY_BUCKETS, 'Количество повторов одинаковых SQL-запросов.'
+    ),
+    'response_size_bytes': (SIZE_BUCKETS, 'Размер ответа.'),
+}
+
+IN_LIST_RE = re.compile(r'%s(?:\s*,\s*%s)+')
+NUMBER_RE = re.compile(r'\b\d+\b')
+
+current_metrics = ContextVar('current_metrics', default=None)
+
+
+def get_fingerprint(sql):
+    """Приводит SQL к виду, одинаковому для запросов с разными значениями."""
+    return NUMBER_RE.sub('?', IN_LIST_RE.sub('%s, ...', sql))
+
+
+def record_query(execute, sql, params, many, context):
+    """Обёртка execute, считающая запросы текущего HTTP-запроса."""
+    metrics = current_metrics.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.add_query(sql, time.perf_counter() - started)
+
+
+class RequestMetrics:
+    """Показатели одного HTTP-запроса."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.view_started = self.view_finished = self.finished = None
+        self.action = None
+        self.db_time = 0
+        self.view_db_time = None
+        self.queries = Counter()
+
+    def add_query(self, sql, duration):
+        self.db_time += duration
+        self.queries[get_fingerprint(sql)] += 1
+
+    def start_view(self, action):
+        self.view_started = time.perf_counter()
+        self.action = action
+
+    def finish_view(self):
+        self.view_finished = time.perf_counter()
+        self.view_db_time = self.db_time
+
+    def finish(self):
+        self.finished = time.perf_counter()
+        if self.view_finished is None:
+            self.finish_view()
+
+    @property
+    def duplicates(self):
+        return Counter(
+            {
+                sql: count - 1
+                for sql, count in self.queries.items()
+                if count > 1
+            }
+        )
+
+    def get_values(self, response):
+        view_started = self.view_started or self.started
+        values = {
+            'request_duration_seconds': self.finished - self.started,
+            'db_duration_seconds': self.db_time,
+            'serialize_duration_seconds': max(
+                self.view_finished - view_started - self.view_db_time, 0
+            ),
+            'render_duration_seconds': max(
+                self.finished
+                - self.view_finished
+                - (self.db_time - self.view_db_time),
+                0,
+            ),
+            'db_queries': sum(self.queries.values()),
+            'duplicate_queries': sum(self.duplicates.values()),
+        }
+        if not response.streaming:
+            values['response_size_bytes'] = len(response.content)
+        return values
+
+    def get_server_timing(self, values):
+        return ', '.join(
+            (
+                'db;dur={:.1f};desc="{} queries, {} duplicates"'.format(
+                    values['db_duration_seconds'] * 1000,
+                    values['db_queries'],
+                    values['duplicate_queries'],
+                ),
+                'serialize;dur={:.1f}'.format(
+                    values['serialize_duration_seconds'] * 1000
+                ),
+                'render;dur={:.1f}'.format(
+                    values['render_duration_seconds'] * 1000
+                ),
+                'total;dur={:.1f}'.format(
+                    values['request_duration_seconds'] * 1000
+                ),
+            )
+        )
+
+
+def new_histogram(buckets):
+    return [[0] * (len(buckets) + 1), 0, 0]
+
+
+class MetricsRegistry:
+    """Скользящие гистограммы показателей по view и action.
+
+    Наблюдения раскладываются по минутным слотам, старше окна WINDOW
+    слоты отбрасываются. Каждый процесс раз в FLUSH_INTERVAL секунд
+    публикует свои слоты в кеше Django, а collect() складывает данные
+    всех процессов, если кеш общий.
+    """
+
+    def __init__(self, window):
+        self.window = window
+        self.flushed = 0
+        self._lock = Lock()
+        self._slots = {}
+
+    @property
+    def worker(self):
+        # pid берётся при каждом обращении: с preload_app реестр создаётся
+        # в мастере gunicorn до fork, и у воркеров pid уже другой.
+        return f'{socket.gethostname()}:{os.getpid()}'
+
+    def get_current_slot(self):
+        return int(time.time() // SLOT_SECONDS)
+
+    def is_expired(self, slot, current_slot):
+        return (current_slot - slot) * SLOT_SECONDS >= self.window
+
+    def observe(self, view, action, values, duplicates):
+        current_slot = self.get_current_slot()
+        with self._lock:
+            entry = self._slots.setdefault(current_slot, {}).setdefault(
+                (view, action), {'histograms': {}, 'duplicates': Counter()}
+            )
+            for name, value in values.items():
+                buckets = HISTOGRAMS[name][0]
+                histogram = entry['histograms'].setdefault(
+                    name, new_histogram(buckets)
+                )
+                index = next(
+                    (
+                        index
+                        for index, bound in enumerate(buckets)
+                        if value <= bound
+                    ),
+                    len(buckets),
+                )
+                histogram[0][index] += 1
+                histogram[1] += value
+                histogram[2] += 1
+            entry['duplicates'].update(duplicates)
+            for slot in tuple(self._slots):
+                if self.is_expired(slot, current_slot):
+                    del self._slots[slot]
+
+    @property
+    def flush_due(self):
+        return time.monotonic() - self.flushed >= FLUSH_INTERVAL
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                slot: {
+                    key: {
+                        'histograms': {
+                            name: [list(counts), total, count]
+                            for name, (counts, total, count) in entry[
+                                'histograms'
+                            ].items()
+                        },
+                        'duplicates': Counter(entry['duplicates']),
+                    }
+                    for key, entry in entries.items()
+                }
+                for slot, entries in self._slots.items()
+            }
+
+    def flush(self):
+        self.flushed = time.monotonic()
+        now = time.time()
+        cache.set(
+            WORKER_KEY.format(worker=self.worker),
+            self.snapshot(),
+            timeout=self.window,
+        )
+        workers = cache.get(WORKERS_KEY) or {}
+        workers = {
+            worker: seen
+            for worker, seen in workers.items()
+            if now - seen < self.window
+        }
+        workers[self.worker] = now
+        cache.set(WORKERS_KEY, workers, timeout=None)
+
+    def collect(self):
+        """Складывает слоты этого и остальных процессов в пределах окна."""
+        snapshots = [self.snapshot()]
+        others = [
+            WORKER_KEY.format(worker=worker)
+            for worker in cache.get(WORKERS_KEY) or {}
+            if worker != self.worker
+        ]
+        snapshots.extend(cache.get_many(others).values())
+        current_slot = self.get_current_slot()
+        result = {}
+        for snapshot in snapshots:
+            for slot, entries in snapshot.items():
+                if self.is_expired(slot, current_slot):
+                    continue
+                for key, entry in entries.items():
+                    merged = result.setdefault(
+                        key, {'histograms': {}, 'duplicates': Counter()}
+                    )
+                    for name, (counts, total, count) in entry[
+                        'histograms'
+                    ].items():
+                        histogram = merged['histograms'].setdefault(
+                            name, new_histogram(HISTOGRAMS[name][0])
+                        )
+                        for index, value in enumerate(counts):
+                            histogram[0][index] += value
+                        histogram[1] += total
+                        histogram[2] += count
+                    merged['duplicates'].update(entry['duplicates'])
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._slots.clear()
+
+
+registry = MetricsRegistry(window=settings.REQUEST_METRICS['WINDOW'])
+
+
+def escape_label(value):
+    return (
+        str(value)
+        .replace('\\', '\\\\')
+        .replace('"', '\\"')
+        .replace('\n', '\\n')
+    )
+
+
+def format_labels(**labels):
+    return ','.join(
+        f'{name}="{escape_label(value)}"' for name, value in labels.items()
+    )
+
+
+def render_prometheus(collected, cache_stats=None):
+    """Форматирует собранные показатели в текстовом формате Prometheus."""
+    lines = []
+    window = registry.window
+    for name, (buckets, description) in HISTOGRAMS.items():
+        metric = f'{METRIC_PREFIX}{name}'
+        lines.append(f'# HELP {metric} {description} Окно {window} с.')
+        lines.append(f'# TYPE {metric} histogram')
+        for (view, action), entry in sorted(collected.items()):
+            histogram = entry['histograms'].get(name)
+            if histogram is None:
+                continue
+            counts, total, count = histogram
+            labels = format_labels(view=view, action=action)
+            cumulative = 0
+            for bound, value in zip((*buckets, '+Inf'), counts):
+                cumulative += value
+                lines.append(
+                    f'{metric}_bucket{{{labels},le="{bound}"}} {cumulative}'
+                )
+            lines.append(f'{metric}_sum{{{labels}}} {total}')
+            lines.append(f'{metric}_count{{{labels}}} {count}')
+    metric = f'{METRIC_PREFIX}duplicate_query_executions'
+    lines.append(
+        f'# HELP {metric} Самые частые повторы SQL-запросов. '
+        f'Окно {window} с.'
+    )
+    lines.append(f'# TYPE {metric} gauge')
+    for (view, action), entry in sorted(collected.items()):
+        for sql, count in entry['duplicates'].most_common(TOP_DUPLICATES):
+            labels = format_labels(view=view, action=action, query=sql)
+            lines.append(f'{metric}{{{labels}}} {count}')
+    cache_stats = cache_stats or {}
+    for key in ('hits', 'misses', 'size'):
+        if not cache_stats:
+            break
+        metric = f'{METRIC_PREFIX}cache_{key}'
+        lines.append(f'# TYPE {metric} gauge')
+        for name, stats in cache_stats.items():
+            lines.append(
+                f'{metric}{{{format_labels(cache=name)}}} {stats[key]}'
+            )
+    return '\n'.join(lines) + '\n'
+
+
+class RequestMetricsMiddleware:
+    """Собирает показатели запроса по view и action.
+
+    Считает SQL-запросы и их время, повторы одинаковых запросов, время
+    view и рендеринга, размер ответа. Если включено, отдаёт их в
+    заголовке Server-Timing.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_METRICS['ENABLED']:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+            # Хуки должны быть в режиме обработчика, иначе Django
+            # выполнит их в потоке через sync_to_async.
+            self.process_view = self.aprocess_view
+            self.process_template_response = self.aprocess_template_response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        try:
+            response = self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        if self.record(request, response, metrics):
+            registry.flush()
+        return response
+
+    async def __acall__(self, request):
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        if self.record(request, response, metrics):
+            await sync_to_async(registry.flush)()
+        return response
+
+    def record(self, request, response, metrics):
+        """Сохраняет показатели запроса.
+
+        Возвращает True, если пора опубликовать реестр в кеше.
+        """
+        metrics.finish()
+        values = metrics.get_values(response)
+        if settings.REQUEST_METRICS['SERVER_TIMING']:
+            response['Server-Timing'] = metrics.get_server_timing(values)
+        match = request.resolver_match
+        if match is None:
+            return False
+        registry.observe(
+            match.view_name or match._func_path,
+            metrics.action or request.method.lower(),
+            values,
+            metrics.duplicates,
+        )
+        return registry.flush_due
+
+    def start_view(self, request, view_func):
+        actions = getattr(view_func, 'actions', None) or {}
+        current_metrics.get().start_view(
+            actions.get(request.method.lower())
+        )
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        self.start_view(request, view_func)
+
+    def process_template_response(self, request, response):
+        current_metrics.get().finish_view()
+        return response
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        self.start_view(request, view_func)
+
+    async def aprocess_template_response(self, request, response):
+        current_metrics.get().finish_view()
+        return response
@@ -1,10 +1,31 @@
+from hashlib import md5
+
+from django.core.cache import cache
+from django.http import HttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.cache import (get_conditional_response, patch_cache_control,
+                                patch_vary_headers)
+from django.utils.http import quote_etag
 from rest_framework import status
 from rest_framework.response import Response
 
+from api.cache import CATALOG_CACHE_TIMEOUT, get_catalog_response_key
+from backend.db_routers import primary_reads
 from recipes.models import Recipe
 
 
+def catalog_response(request, content, content_type):
+    """Отдаёт ответ справочника с ETag и проверкой If-None-Match."""
+    etag = quote_etag(md5(content, usedforsecurity=False).hexdigest())
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(content, content_type=content_type)
+    response['ETag'] = etag
+    patch_cache_control(response, public=True, no_cache=True)
+    patch_vary_headers(response, ('Accept',))
+    return response
+
+
 class UserRecipeMixin:
 
     def base_user_recipe_action(
@@ -26,3 +47,45 @@ class UserRecipeMixin:
         serializer.is_valid(raise_exception=True)
         serializer.save()
         return Response(data=serializer.data, status=status.HTTP_201_CREATED)
+
+
+class CatalogCacheMixin:
+    """Кеширует готовые ответы справочников тегов и ингредиентов.
+
+    Кешируются только JSON-ответы. Ключ кеша включает версию каталога,
+    которую сигналы увеличивают при изменении тегов и ингредиентов.
+    """
+
+    def list(self, request, *args, **kwargs):
+        return self.cached_response(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached_response(
+            super().retrieve, request, *args, **kwargs
+        )
+
+    def cached_response(self, handler, request, *args, **kwargs):
+        renderer = request.accepted_renderer
+        if renderer.format != 'json':
+            return handler(request, *args, **kwargs)
+        key = get_catalog_response_key(request)
+        cached = cache.get(key)
+        if cached is None:
+            with primary_reads():
+                response = handler(request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            content_type = renderer.media_type
+            if renderer.charset:
+                content_type += f'; charset={renderer.charset}'
+            cached = (
+                renderer.render(
+                    response.data,
+                    request.accepted_media_type,
+                    self.get_renderer_context(),
+                ),
+                content_type,
+            )
+            cache.set(key, cached, CATALOG_CACHE_TIMEOUT)
+
+        return catalog_response(request, *cached)
@@ -1,9 +1,111 @@
+from django.core.paginator import InvalidPage
+from django.db.models import QuerySet
+from rest_framework.exceptions import NotFound
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 
 
 class LimitPageNumberPagination(PageNumberPagination):
+    """Постраничная пагинация с необязательным режимом курсора.
+
+    Если в запросе есть параметр cursor, страница выбирается условием
+    id < cursor без OFFSET и подсчёта количества записей. Формат ответа
+    сохраняется, но count и previous в этом режиме равны null. Курсор
+    работает только с запросами, отсортированными по убыванию id, в
+    остальных случаях используется обычная постраничная пагинация.
+    """
+
     page_size_query_param = 'limit'
     page_size = 6
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Неверный курсор.'
+    cursor_orderings = ((), ('-id',), ('-pk',))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.use_cursor(queryset, request):
+            return super().paginate_queryset(queryset, request, view)
+        queryset, page_size = self.get_cursor_queryset(queryset, request)
+        return self.get_cursor_page(list(queryset), page_size)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """Вариант paginate_queryset для асинхронных view.
+
+        Количество и страница читаются асинхронным ORM, без браузерного
+        API и его элементов управления.
+        """
+        if self.use_cursor(queryset, request):
+            queryset, page_size = self.get_cursor_queryset(queryset, request)
+            return self.get_cursor_page(
+                [item async for item in queryset], page_size
+            )
+        self.request = request
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        paginator = self.django_paginator_class(queryset, page_size)
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(
+                self.invalid_page_message.format(
+                    page_number=page_number, message=str(exc)
+                )
+            )
+        self.page.object_list = [
+            item async for item in self.page.object_list
+        ]
+        return list(self.page)
+
+    def use_cursor(self, queryset, request):
+        self.cursor_mode = (
+            self.cursor_query_param in request.query_params
+            and isinstance(queryset, QuerySet)
+            and tuple(queryset.query.order_by) in self.cursor_orderings
+        )
+        return self.cursor_mode
+
+    def get_cursor_queryset(self, queryset, request):
+        self.request = request
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            try:
+                queryset = queryset.filter(pk__lt=int(cursor))
+            except ValueError:
+                raise NotFound(self.invalid_cursor_message)
+        page_size = self.get_page_size(request)
+        return queryset.order_by('-pk')[:page_size + 1], page_size
+
+    def get_cursor_page(self, page, page_size):
+        self.next_cursor = None
+        if len(page) > page_size:
+            page = page[:page_size]
+            self.next_cursor = page[-1].pk
+        return page
+
+    def get_paginated_response(self, data):
+        if not self.cursor_mode:
+            return super().get_paginated_response(data)
+        return Response(
+            {
+                'count': None,
+                'next': self.get_next_cursor_link(),
+                'previous': None,
+                'results': data,
+            }
+        )
+
+    def get_next_cursor_link(self):
+        if self.next_cursor is None:
+            return None
+        url = remove_query_param(
+            self.request.build_absolute_uri(), self.page_query_param
+        )
+        return replace_query_param(
+            url, self.cursor_query_param, self.next_cursor
+        )
 
 
 class RecipesLimitPagination(PageNumberPagination):
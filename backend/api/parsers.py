@@ -0,0 +1,49 @@
+import json
+
+from django.conf import settings
+from rest_framework.exceptions import ParseError
+from rest_framework.parsers import BaseParser, JSONParser
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONParser(JSONParser):
+    """Разбирает JSON в UTF-8 через orjson, если он установлен."""
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        encoding = (parser_context or {}).get(
+            'encoding', settings.DEFAULT_CHARSET
+        )
+        if orjson is None or encoding.lower() not in ('utf-8', 'utf8'):
+            return super().parse(stream, media_type, parser_context)
+        try:
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as error:
+            raise ParseError(f'JSON parse error - {error}')
+
+
+class NDJSONParser(BaseParser):
+    """Разбирает NDJSON построчно, не читая тело запроса целиком.
+
+    Возвращает генератор кортежей (номер строки, объект, ошибка).
+    """
+
+    media_type = 'application/x-ndjson'
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+        return self.rows(stream, encoding)
+
+    def rows(self, stream, encoding):
+        for line_number, line in enumerate(stream, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield line_number, json.loads(line.decode(encoding)), None
+            except ValueError as error:
+                yield line_number, None, f'Некорректный JSON: {error}'
@@ -0,0 +1,144 @@
+import csv
+import json
+from abc import ABC, abstractmethod
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+LINE_SEPARATORS = (
+    (b'\xe2\x80\xa8', b'\\u2028'),
+    (b'\xe2\x80\xa9', b'\\u2029'),
+)
+
+
+class FastJSONRenderer(JSONRenderer):
+    """JSON-рендерер, который сериализует данные сразу в байты.
+
+    Использует orjson, если он установлен, и json из стандартной
+    библиотеки иначе. Ответы с отступами, например для браузерного API,
+    и настройки, которые orjson не поддерживает, отдаются JSONRenderer.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        renderer_context = renderer_context or {}
+        if (
+            self.get_indent(accepted_media_type, renderer_context)
+            or self.ensure_ascii
+            or not self.compact
+        ):
+            return super().render(data, accepted_media_type, renderer_context)
+        if orjson is not None:
+            content = orjson.dumps(
+                data,
+                default=JSONEncoder().default,
+                option=orjson.OPT_NON_STR_KEYS,
+            )
+        else:
+            content = json.dumps(
+                data,
+                cls=self.encoder_class,
+                ensure_ascii=False,
+                allow_nan=not self.strict,
+                separators=(',', ':'),
+            ).encode()
+        for separator, escaped in LINE_SEPARATORS:
+            if separator in content:
+                content = content.replace(separator, escaped)
+        return content
+
+
+class PrometheusRenderer(BaseRenderer):
+    media_type = 'text/plain'
+    format = 'prometheus'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if isinstance(data, dict):
+            data = ''.join(
+                f'# {key}: {value}\n' for key, value in data.items()
+            )
+        return data.encode(self.charset)
+
+
+class Echo:
+
+    def write(self, value):
+        return value
+
+
+class ShoppingListRenderer(BaseRenderer, ABC):
+    """Список покупок в файле.
+
+    Ошибки этими рендерерами не выводятся: RecipeViewSet отдаёт их
+    в JSON.
+    """
+
+    charset = 'utf-8'
+    header = ('Название', 'Количество', 'Единицы измерения')
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return ''.join(self.stream(data)).encode(self.charset)
+
+    @abstractmethod
+    def stream(self, ingredients):
+        """Возвращает части файла по списку ингредиентов."""
+
+
+class ShoppingListTextRenderer(ShoppingListRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+    def stream(self, ingredients):
+        yield 'Список покупок\n\n'
+        for ingredient in ingredients:
+            yield '{} ({}) — {}\n'.format(
+                ingredient['ingredient__name'],
+                ingredient['ingredient__measurement_unit'],
+                ingredient['amount_sum'],
+            )
+
+
+class ShoppingListCSVRenderer(ShoppingListRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def stream(self, ingredients):
+        writer = csv.writer(Echo())
+        yield writer.writerow(self.header)
+        for ingredient in ingredients:
+            yield writer.writerow(
+                (
+                    ingredient['ingredient__name'],
+                    ingredient['amount_sum'],
+                    ingredient['ingredient__measurement_unit'],
+                )
+            )
+
+
+class ShoppingListJSONRenderer(ShoppingListRenderer):
+    media_type = 'application/json'
+    format = 'json'
+
+    def stream(self, ingredients):
+        yield '['
+        for index, ingredient in enumerate(ingredients):
+            if index:
+                yield ','
+            yield json.dumps(
+                {
+                    'name': ingredient['ingredient__name'],
+                    'amount': ingredient['amount_sum'],
+                    'measurement_unit': (
+                        ingredient['ingredient__measurement_unit']
+                    ),
+                },
+                ensure_ascii=False,
+            )
+        yield ']'
@@ -1,16 +1,29 @@
+import logging
+
 from django.contrib.auth import get_user_model
 from django.contrib.auth.password_validation import validate_password
+from django.db import transaction
 from django.shortcuts import get_object_or_404
 from rest_framework import serializers
 from rest_framework.validators import ValidationError
 
-from api.fields import Base64ImageField
+from api.fields import (Base64ImageField, PreloadedListSerializer,
+                        PreloadedPrimaryKeyRelatedField)
+from api.fragments import get_recipe_fragments
+from api.interactions import get_user_interactions
 from api.pagination import RecipesLimitPagination
+from recipes.images import schedule_thumbnails
+from recipes.matching import recipe_match_index
 from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
                             ShoppingCart, Tag)
+from recipes.search import update_search_vector
 from users.models import Subscription
 
 User = get_user_model()
+logger = logging.getLogger(__name__)
+
+MAX_MATCH_INGREDIENTS = 100
+DOES_NOT_EXIST_MESSAGE = 'В БД нет таких значений: {pk_values}!'
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -43,12 +56,10 @@ class UserGetSerializer(serializers.ModelSerializer):
         )
 
     def get_is_subscribed(self, obj):
-        user = self.context.get('request').user
-        if user.is_authenticated:
-            return Subscription.objects.filter(
-                author=obj.pk, user=user
-            ).exists()
-        return False
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
+        interactions = get_user_interactions(self.context.get('request'))
+        return obj.pk in interactions.subscriptions
 
 
 class UserPostSerializer(serializers.ModelSerializer):
@@ -81,11 +92,12 @@ class AvatarSerializer(serializers.ModelSerializer):
 
 
 class RecipeIngredientPostSerializer(serializers.ModelSerializer):
-    id = serializers.PrimaryKeyRelatedField(queryset=Ingredient.objects.all())
+    id = PreloadedPrimaryKeyRelatedField(queryset=Ingredient.objects.all())
 
     class Meta:
         model = RecipeIngredient
         fields = ('id', 'amount')
+        list_serializer_class = PreloadedListSerializer
 
 
 class RecipeIngredientSerializer(serializers.ModelSerializer):
@@ -106,14 +118,16 @@ class RecipeIngredientSerializer(serializers.ModelSerializer):
 
 class RecipePostSerializer(serializers.ModelSerializer):
     ingredients = RecipeIngredientPostSerializer(
-        many=True, source='recipeingredient_set'
+        many=True,
+        source='recipeingredient_set',
+        error_messages={'does_not_exist': DOES_NOT_EXIST_MESSAGE},
     )
     image = Base64ImageField()
     author = serializers.HiddenField(default=serializers.CurrentUserDefault())
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = PreloadedPrimaryKeyRelatedField(
         queryset=Tag.objects.all(),
         many=True,
-        error_messages={'does_not_exist': 'В БД нет такого значения!'},
+        error_messages={'does_not_exist': DOES_NOT_EXIST_MESSAGE},
     )
 
     class Meta:
@@ -175,26 +189,113 @@ class RecipePostSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         ingredients = validated_data.pop('ingredients')
         tags = validated_data.pop('tags')
-        recipe = Recipe.objects.create(**validated_data)
-
-        recipe.tags.set(tags)
-        self.ingredients_set(ingredients=ingredients, recipe=recipe)
+        with transaction.atomic():
+            recipe = Recipe.objects.create(**validated_data)
+            recipe.tags.set(tags)
+            self.ingredients_set(ingredients=ingredients, recipe=recipe)
+            recipe_match_index.schedule(recipe.id)
+            update_search_vector(recipe)
+            schedule_thumbnails(recipe)
 
         return recipe
 
+    def ingredients_update(self, ingredients, recipe):
+        """Приводит ингредиенты рецепта к новому списку.
+
+        Меняются только отличающиеся строки. Возвращает количество
+        добавленных, изменённых и удалённых строк.
+        """
+        existing = {
+            recipe_ingredient.ingredient_id: recipe_ingredient
+            for recipe_ingredient in RecipeIngredient.objects.filter(
+                recipe=recipe
+            )
+        }
+        to_create, to_update = [], []
+        for ingredient in ingredients:
+            recipe_ingredient = existing.pop(ingredient['id'].id, None)
+            if recipe_ingredient is None:
+                to_create.append(
+                    RecipeIngredient(
+                        ingredient=ingredient['id'],
+                        recipe=recipe,
+                        amount=ingredient['amount'],
+                    )
+                )
+            elif recipe_ingredient.amount != ingredient['amount']:
+                recipe_ingredient.amount = ingredient['amount']
+                to_update.append(recipe_ingredient)
+        RecipeIngredient.objects.bulk_create(to_create)
+        RecipeIngredient.objects.bulk_update(to_update, ('amount',))
+        deleted = 0
+        if existing:
+            deleted, _ = RecipeIngredient.objects.filter(
+                pk__in=[
+                    recipe_ingredient.pk
+                    for recipe_ingredient in existing.values()
+                ]
+            ).delete()
+        return len(to_create), len(to_update), deleted
+
+    def tags_update(self, tags, recipe):
+        """Возвращает количество добавленных и удалённых тегов."""
+        current = set(recipe.tags.values_list('pk', flat=True))
+        new = {tag.pk for tag in tags}
+        if current - new:
+            recipe.tags.remove(*(current - new))
+        if new - current:
+            recipe.tags.add(*(new - current))
+        return len(new - current), len(current - new)
+
     def update(self, instance, validated_data):
         ingredients = validated_data.pop('ingredients')
         tags = validated_data.pop('tags')
 
-        instance.tags.set(tags)
-        instance.ingredients.clear()
-        self.ingredients_set(ingredients=ingredients, recipe=instance)
-
-        super().update(instance, validated_data)
+        with transaction.atomic():
+            tags_added, tags_removed = self.tags_update(tags, instance)
+            created, updated, deleted = self.ingredients_update(
+                ingredients=ingredients, recipe=instance
+            )
+            if 'image' in validated_data:
+                validated_data['image_small'] = ''
+                validated_data['image_large'] = ''
+            super().update(instance, validated_data)
+            if created or deleted:
+                recipe_match_index.schedule(instance.id)
+            update_search_vector(instance)
+            if 'image' in validated_data:
+                schedule_thumbnails(instance)
+        logger.info(
+            'Рецепт %s обновлён: ингредиенты +%s ~%s -%s, теги +%s -%s.',
+            instance.id,
+            created,
+            updated,
+            deleted,
+            tags_added,
+            tags_removed,
+        )
         return instance
 
 
+class RecipeListSerializer(serializers.ListSerializer):
+
+    def to_representation(self, data):
+        recipes = list(data.all() if hasattr(data, 'all') else data)
+        fragments = get_recipe_fragments(self.child, recipes)
+        return [
+            self.child.add_viewer_fields(recipe, fragments[recipe.pk])
+            for recipe in recipes
+        ]
+
+
 class RecipeGetSerializer(serializers.ModelSerializer):
+    """Рецепт для чтения.
+
+    Общая для всех пользователей часть ответа берётся из кеша фрагментов,
+    а признаки подписки, избранного и корзины подставляются для текущего
+    пользователя.
+    """
+
     ingredients = RecipeIngredientSerializer(
         many=True, source='recipeingredient_set'
     )
@@ -214,30 +315,78 @@ class RecipeGetSerializer(serializers.ModelSerializer):
             'is_in_shopping_cart',
             'name',
             'image',
+            'image_small',
+            'image_large',
             'text',
             'cooking_time',
         )
+        list_serializer_class = RecipeListSerializer
+
+    def to_representation(self, instance):
+        fragment = get_recipe_fragments(self, (instance,))[instance.pk]
+        return self.add_viewer_fields(instance, fragment)
+
+    def build_fragment(self, instance):
+        representation = super().to_representation(instance)
+        representation['author']['is_subscribed'] = None
+        representation['is_favorited'] = None
+        representation['is_in_shopping_cart'] = None
+        return representation
+
+    def add_viewer_fields(self, instance, fragment):
+        representation = dict(fragment)
+        representation['author'] = dict(fragment['author'])
+        representation['author']['is_subscribed'] = self.fields[
+            'author'
+        ].get_is_subscribed(instance.author)
+        representation['is_favorited'] = self.get_is_favorited(instance)
+        representation['is_in_shopping_cart'] = self.get_is_in_shopping_cart(
+            instance
+        )
+        return representation
 
     def get_is_favorited(self, obj):
-        user = self.context.get('request').user
-        if user.is_authenticated:
-            return Favorite.objects.filter(recipe=obj.pk, user=user).exists()
-        return False
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
+        interactions = get_user_interactions(self.context.get('request'))
+        return obj.pk in interactions.favorites
 
     def get_is_in_shopping_cart(self, obj):
-        user = self.context.get('request').user
-        if user.is_authenticated:
-            return ShoppingCart.objects.filter(
-                recipe=obj.pk, user=user
-            ).exists()
-        return False
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
+        interactions = get_user_interactions(self.context.get('request'))
+        return obj.pk in interactions.shopping_cart
+
+
+class MatchedRecipeSerializer(RecipeGetSerializer):
+
+    def add_viewer_fields(self, instance, fragment):
+        representation = super().add_viewer_fields(instance, fragment)
+        representation['coverage'] = instance.coverage
+        representation['missing_count'] = instance.missing_count
+        return representation
+
+
+class RecipeMatchSerializer(serializers.Serializer):
+    ingredients = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=MAX_MATCH_INGREDIENTS,
+    )
 
 
 class ShortRecipeSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = (
+            'id',
+            'name',
+            'image',
+            'image_small',
+            'image_large',
+            'cooking_time',
+        )
 
 
 class SubscriptionSerializer(serializers.ModelSerializer):
@@ -250,6 +399,11 @@ class SubscriptionSerializer(serializers.ModelSerializer):
         model = Subscription
 
     def get_recipes(self, obj):
+        if hasattr(obj.author, 'limited_recipes'):
+            serializer = ShortRecipeSerializer(
+                obj.author.limited_recipes, many=True
+            )
+            return serializer.data
         recipes = obj.author.recipes.all()
         request = self.context.get('request')
         recipes_limit = request.query_params.get('recipes_limit')
@@ -265,7 +419,7 @@ class SubscriptionSerializer(serializers.ModelSerializer):
         return serializer.data
 
     def get_recipes_count(self, obj):
-        return obj.author.recipes.count()
+        return obj.author.recipes_count
 
     def to_representation(self, instance):
         representation = super().to_representation(instance)
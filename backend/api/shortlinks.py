@@ -0,0 +1,43 @@
+from django.conf import settings
+
+from api.cache import LRUCache
+from recipes.models import LegacyShortLink, Recipe
+from recipes.shortlinks import decode_short_link
+
+RECIPE_PAGE_URL = '/recipes/{pk}/'
+
+
+class ShortLinkCache(LRUCache):
+    """Кеш соответствий короткой ссылки и id рецепта.
+
+    Ссылка рецепта не меняется, поэтому запись заполняется при
+    сохранении рецепта и удаляется вместе с ним или со старой ссылкой.
+    """
+
+    SHARED_CACHE_KEY = 'short_link:{key}'
+
+
+short_link_cache = ShortLinkCache(
+    max_size=settings.SHORT_LINK_CACHE['MAX_SIZE'],
+    timeout=settings.SHORT_LINK_CACHE['TIMEOUT'],
+    local_timeout=settings.SHORT_LINK_CACHE['LOCAL_TIMEOUT'],
+    use_shared_cache=settings.SHORT_LINK_CACHE['USE_SHARED_CACHE'],
+)
+
+
+def get_recipe_ids(link):
+    """Запрос id рецепта по ссылке нового или старого формата."""
+    pk = decode_short_link(link)
+    if pk is None:
+        return LegacyShortLink.objects.filter(link=link).values_list(
+            'recipe_id', flat=True
+        )
+    return Recipe.objects.filter(pk=pk).values_list('pk', flat=True)
+
+
+def resolve_short_link(link):
+    return get_recipe_ids(link).first()
+
+
+async def aresolve_short_link(link):
+    return await get_recipe_ids(link).afirst()
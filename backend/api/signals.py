@@ -0,0 +1,89 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from api.authentication import token_cache
+from api.cache import (AUTHOR_VERSION_KEY, RECIPE_VERSION_KEY,
+                       bump_catalog_version, bump_version)
+from api.interactions import invalidate_user_interactions
+from api.metrics import record_query
+from api.shortlinks import short_link_cache
+from recipes.models import (Favorite, Ingredient, LegacyShortLink, Recipe,
+                            RecipeIngredient, ShoppingCart, Tag)
+from recipes.signals import catalog_imported, thumbnails_created
+from users.models import Subscription
+
+User = get_user_model()
+
+
+@receiver((post_save, post_delete), sender=Favorite)
+@receiver((post_save, post_delete), sender=ShoppingCart)
+@receiver((post_save, post_delete), sender=Subscription)
+def user_interactions_changed(sender, instance, **kwargs):
+    invalidate_user_interactions(instance.user_id)
+
+
+@receiver(catalog_imported)
+@receiver((post_save, post_delete), sender=Ingredient)
+@receiver((post_save, post_delete), sender=Tag)
+def catalog_changed(sender, **kwargs):
+    bump_catalog_version()
+
+
+@receiver(post_delete, sender=Token)
+def token_deleted(sender, instance, **kwargs):
+    token_cache.delete(instance.key)
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance, created, **kwargs):
+    if not created:
+        token_cache.delete_user(instance.pk)
+        bump_version(AUTHOR_VERSION_KEY.format(pk=instance.pk))
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_changed(sender, instance, **kwargs):
+    if kwargs.get('reverse'):
+        transaction.on_commit(bump_catalog_version)
+        return
+    key = RECIPE_VERSION_KEY.format(pk=instance.pk)
+    transaction.on_commit(lambda: bump_version(key))
+
+
+@receiver((post_save, post_delete), sender=RecipeIngredient)
+def recipe_ingredient_changed(sender, instance, **kwargs):
+    key = RECIPE_VERSION_KEY.format(pk=instance.recipe_id)
+    transaction.on_commit(lambda: bump_version(key))
+
+
+@receiver(thumbnails_created)
+def recipe_thumbnails_created(sender, recipe_id, **kwargs):
+    bump_version(RECIPE_VERSION_KEY.format(pk=recipe_id))
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, **kwargs):
+    transaction.on_commit(
+        lambda: short_link_cache.set(instance.short_link, instance.pk)
+    )
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    short_link_cache.delete(instance.short_link)
+
+
+@receiver(post_delete, sender=LegacyShortLink)
+def legacy_short_link_deleted(sender, instance, **kwargs):
+    short_link_cache.delete(instance.link)
+
+
+@receiver(connection_created)
+def connection_opened(sender, connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
@@ -0,0 +1,109 @@
+import json
+import shutil
+import tempfile
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.test import AsyncRequestFactory, TestCase, override_settings
+from rest_framework.authtoken.models import Token
+from rest_framework.response import Response
+
+from api.authentication import token_cache
+from api.views import arecipe_detail, arecipe_list, recipe_detail, recipe_list
+from recipes.models import Favorite, Ingredient, Recipe, RecipeIngredient, Tag
+
+User = get_user_model()
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class AsyncRecipeViewsTests(TestCase):
+    """Асинхронные view рецептов отвечают так же, как RecipeViewSet."""
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='reader', email='reader@example.com', password='password'
+        )
+        cls.token = Token.objects.create(user=cls.user)
+        tag = Tag.objects.create(name='Завтрак', slug='breakfast')
+        ingredient = Ingredient.objects.create(
+            name='Продукт', measurement_unit='г'
+        )
+        cls.recipes = []
+        for index in range(3):
+            recipe = Recipe.objects.create(
+                author=cls.user,
+                name=f'Рецепт {index}',
+                text='Описание',
+                cooking_time=10,
+                image=ContentFile(b'image', name='image.webp'),
+            )
+            recipe.tags.set((tag,))
+            RecipeIngredient.objects.create(
+                recipe=recipe, ingredient=ingredient, amount=1
+            )
+            cls.recipes.append(recipe)
+        Favorite.objects.create(user=cls.user, recipe=cls.recipes[0])
+
+    def setUp(self):
+        cache.clear()
+        token_cache.clear()
+        self.factory = AsyncRequestFactory()
+
+    def request(self, path, **headers):
+        return self.factory.get(path, **headers)
+
+    async def assert_same_response(self, async_view, sync_view, path, **kw):
+        headers = {'HTTP_AUTHORIZATION': f'Token {self.token.key}'}
+        # Синхронный view кладёт токен в кеш, после чего асинхронный
+        # обходится без RecipeViewSet.
+        for extra in ({}, headers):
+            expected = await sync_to_async(sync_view)(
+                self.request(path, **extra), **kw
+            )
+            expected.render()
+            response = await async_view(self.request(path, **extra), **kw)
+            self.assertNotIsInstance(response, Response)
+            self.assertEqual(response.status_code, expected.status_code)
+            self.assertEqual(
+                json.loads(response.content), json.loads(expected.content)
+            )
+
+    async def test_list(self):
+        for path in (
+            '/api/recipes/',
+            '/api/recipes/?limit=1&page=2',
+            '/api/recipes/?is_favorited=1',
+            '/api/recipes/?tags=breakfast',
+            '/api/recipes/?cursor=&limit=2',
+        ):
+            with self.subTest(path=path):
+                await self.assert_same_response(
+                    arecipe_list, recipe_list, path
+                )
+
+    async def test_detail(self):
+        pk = self.recipes[0].pk
+        await self.assert_same_response(
+            arecipe_detail, recipe_detail, f'/api/recipes/{pk}/', pk=pk
+        )
+
+    async def test_errors_are_handled_by_viewset(self):
+        for path in ('/api/recipes/?page=9', '/api/recipes/?ordering=x'):
+            with self.subTest(path=path):
+                response = await arecipe_list(self.request(path))
+                self.assertIsInstance(response, Response)
+                self.assertIn(response.status_code, (400, 404))
+        response = await arecipe_detail(
+            self.request('/api/recipes/0/'), pk=0
+        )
+        self.assertEqual(response.status_code, 404)
@@ -0,0 +1,108 @@
+import base64
+import json
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from PIL import Image
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, Recipe, Tag
+
+User = get_user_model()
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def make_image():
+    buffer = BytesIO()
+    Image.new('RGB', (40, 30), 'red').save(buffer, 'PNG')
+    return 'data:image/png;base64,' + base64.b64encode(
+        buffer.getvalue()
+    ).decode()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class RecipeBulkTests(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='author',
+            email='author@example.com',
+            password='password',
+            first_name='Имя',
+            last_name='Фамилия',
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.tag = Tag.objects.create(name='Завтрак', slug='breakfast')
+        self.ingredients = [
+            Ingredient.objects.create(name=name, measurement_unit='г')
+            for name in ('мука', 'сахар')
+        ]
+
+    def test_export_can_be_imported(self):
+        response = self.client.post(
+            '/api/recipes/',
+            {
+                'name': 'Блины',
+                'text': 'Смешать и пожарить.',
+                'cooking_time': 20,
+                'image': make_image(),
+                'tags': [self.tag.id],
+                'ingredients': [
+                    {'id': ingredient.id, 'amount': amount}
+                    for ingredient, amount in zip(self.ingredients, (200, 30))
+                ],
+            },
+            format='json',
+        )
+        self.assertEqual(response.status_code, 201, response.json())
+
+        response = self.client.get('/api/recipes/bulk/')
+        self.assertEqual(response.status_code, 200)
+        exported = b''.join(response.streaming_content)
+        self.assertEqual(len(exported.splitlines()), 1)
+
+        response = self.client.post(
+            '/api/recipes/bulk/',
+            exported,
+            content_type='application/x-ndjson',
+        )
+        self.assertEqual(response.status_code, 201, response.json())
+        self.assertEqual(response.json(), {'created': 1, 'errors': []})
+
+        original, imported = Recipe.objects.order_by('id')
+        self.assertEqual(imported.author, self.user)
+        self.assertTrue(imported.image)
+        self.assertNotEqual(imported.image.name, original.image.name)
+        for field in ('name', 'text', 'cooking_time'):
+            self.assertEqual(
+                getattr(imported, field), getattr(original, field)
+            )
+        self.assertEqual(list(imported.tags.all()), [self.tag])
+        self.assertEqual(
+            sorted(
+                imported.recipeingredient_set.values_list(
+                    'ingredient_id', 'amount'
+                )
+            ),
+            sorted(
+                original.recipeingredient_set.values_list(
+                    'ingredient_id', 'amount'
+                )
+            ),
+        )
+        self.assertEqual(
+            json.loads(exported)['image'].split(';base64,')[0],
+            'data:image/webp',
+        )
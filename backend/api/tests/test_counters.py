@@ -0,0 +1,81 @@
+import base64
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from PIL import Image
+from rest_framework.test import APIClient
+
+from recipes.models import Favorite, Recipe, ShoppingCart
+
+User = get_user_model()
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+def make_image():
+    buffer = BytesIO()
+    Image.new('RGB', (10, 10), 'red').save(buffer, 'PNG')
+    return 'data:image/png;base64,' + base64.b64encode(
+        buffer.getvalue()
+    ).decode()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class CounterTests(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(
+            username='author', email='author@example.com', password='password'
+        )
+        self.reader = User.objects.create_user(
+            username='reader', email='reader@example.com', password='password'
+        )
+        self.recipe = Recipe.objects.create(
+            author=self.user,
+            name='Суп',
+            text='Сварить.',
+            cooking_time=15,
+            image=ContentFile(b'image', name='image.webp'),
+        )
+        # request.user устарел так же, как копия из кеша токенов.
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_user_saves_keep_recipes_count(self):
+        response = self.client.put(
+            '/api/users/me/avatar/', {'avatar': make_image()}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        response = self.client.post(
+            '/api/users/set_password/',
+            {'current_password': 'password', 'new_password': 'Pa$$w0rd-2'},
+            format='json',
+        )
+        self.assertEqual(response.status_code, 204)
+        response = self.client.delete('/api/users/me/avatar/')
+        self.assertEqual(response.status_code, 204)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.recipes_count, 1)
+        self.assertTrue(self.user.check_password('Pa$$w0rd-2'))
+
+    def test_recipe_save_keeps_concurrent_increments(self):
+        recipe = Recipe.objects.get(pk=self.recipe.pk)
+        Favorite.objects.create(user=self.reader, recipe=self.recipe)
+        ShoppingCart.objects.create(user=self.reader, recipe=self.recipe)
+        recipe.name = 'Щи'
+        recipe.save()
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.name, 'Щи')
+        self.assertEqual(recipe.favorites_count, 1)
+        self.assertEqual(recipe.in_carts_count, 1)
@@ -0,0 +1,65 @@
+import base64
+import os
+from io import BytesIO
+
+from django.test import SimpleTestCase, TestCase
+from PIL import Image
+from rest_framework.exceptions import ValidationError
+
+from api.fields import BASE64_CHUNK_SIZE, Base64ImageField
+from api.serializers import RecipeIngredientPostSerializer
+from recipes.models import Ingredient
+
+
+def make_png(size=(300, 300)):
+    image = Image.frombytes('RGB', size, os.urandom(size[0] * size[1] * 3))
+    buffer = BytesIO()
+    image.save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+class Base64ImageFieldTests(SimpleTestCase):
+
+    def to_internal_value(self, content, encode=base64.b64encode):
+        return Base64ImageField().to_internal_value(
+            'data:image/png;base64,' + encode(content).decode()
+        )
+
+    def test_line_wrapped_base64_is_accepted(self):
+        content = make_png()
+        self.assertGreater(len(content), BASE64_CHUNK_SIZE)
+        for encode in (base64.b64encode, base64.encodebytes):
+            with self.subTest(encode=encode.__name__):
+                image = self.to_internal_value(content, encode)
+                self.assertEqual(Image.open(image).size, (300, 300))
+
+    def test_truncated_image_is_rejected(self):
+        content = make_png()
+        with self.assertRaises(ValidationError) as context:
+            self.to_internal_value(content[:len(content) // 2])
+        self.assertEqual(context.exception.get_codes(), ['invalid_image'])
+
+
+class PreloadedListSerializerTests(TestCase):
+
+    def test_missing_ids_are_reported_in_one_error(self):
+        ingredient = Ingredient.objects.create(
+            name='Продукт', measurement_unit='г'
+        )
+        serializer = RecipeIngredientPostSerializer(
+            data=[
+                {'id': ingredient.pk, 'amount': 1},
+                {'id': 1000, 'amount': 1},
+                {'id': 1001, 'amount': 1},
+            ],
+            many=True,
+        )
+        with self.assertNumQueries(1):
+            self.assertFalse(serializer.is_valid())
+        self.assertEqual(
+            serializer.errors,
+            [
+                'Недопустимые первичные ключи 1000, 1001 - '
+                'объекты не существуют.'
+            ],
+        )
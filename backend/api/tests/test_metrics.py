@@ -0,0 +1,89 @@
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from api.metrics import WORKER_KEY, WORKERS_KEY, registry
+from recipes.models import Recipe
+
+User = get_user_model()
+
+MEDIA_ROOT = tempfile.mkdtemp()
+REQUEST_METRICS = settings.REQUEST_METRICS | {'SERVER_TIMING': True}
+KEY = ('recipe-detail', 'retrieve')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, REQUEST_METRICS=REQUEST_METRICS)
+class RequestMetricsTests(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            username='admin', email='admin@example.com', password='password'
+        )
+        cls.recipe = Recipe.objects.create(
+            author=cls.admin,
+            name='Рецепт',
+            text='Описание',
+            cooking_time=10,
+            image=ContentFile(b'image', name='image.webp'),
+        )
+
+    def setUp(self):
+        cache.clear()
+        registry.clear()
+        registry.flushed = 0
+        self.client = APIClient()
+
+    def get_recipe(self):
+        response = self.client.get(f'/api/recipes/{self.recipe.pk}/')
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_server_timing_and_histograms(self):
+        response = self.get_recipe()
+        timing = response['Server-Timing']
+        for name in ('db', 'serialize', 'render', 'total'):
+            self.assertIn(f'{name};dur=', timing)
+        histograms = registry.collect()[KEY]['histograms']
+        self.assertEqual(histograms['request_duration_seconds'][2], 1)
+        self.assertIn(f'"{histograms["db_queries"][1]} queries', timing)
+        self.assertEqual(
+            histograms['response_size_bytes'][1], len(response.content)
+        )
+
+    def test_flush_is_throttled(self):
+        self.get_recipe()
+        worker_key = WORKER_KEY.format(worker=registry.worker)
+        self.assertIn(registry.worker, cache.get(WORKERS_KEY))
+        self.assertEqual(cache.get(worker_key), registry.snapshot())
+        self.get_recipe()
+        self.assertNotEqual(cache.get(worker_key), registry.snapshot())
+
+    def test_other_workers_are_collected(self):
+        self.get_recipe()
+        cache.set(WORKER_KEY.format(worker='other:1'), registry.snapshot())
+        cache.set(WORKERS_KEY, cache.get(WORKERS_KEY) | {'other:1': 0})
+        histograms = registry.collect()[KEY]['histograms']
+        self.assertEqual(histograms['request_duration_seconds'][2], 2)
+
+    def test_prometheus_view(self):
+        self.get_recipe()
+        self.client.force_authenticate(self.admin)
+        response = self.client.get('/api/_metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(
+            'foodgram_request_duration_seconds_count'
+            '{view="recipe-detail",action="retrieve"} 1',
+            response.content.decode(),
+        )
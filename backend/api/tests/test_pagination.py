@@ -0,0 +1,86 @@
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from recipes.models import Recipe
+
+User = get_user_model()
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class CursorPaginationTests(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user(
+            username='author', email='author@example.com', password='password'
+        )
+        cls.recipe_ids = [
+            Recipe.objects.create(
+                author=author,
+                name=f'Рецепт {index}',
+                text='Описание',
+                cooking_time=10,
+                image=ContentFile(b'image', name='image.webp'),
+            ).pk
+            for index in range(5)
+        ][::-1]
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def get(self, url, status_code=200):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status_code)
+        return response.json()
+
+    def test_pages_follow_next_without_count(self):
+        url = 'http://testserver/api/recipes/?page=2&cursor=&limit=2'
+        ids = []
+        while url:
+            with CaptureQueriesContext(connection) as context:
+                page = self.get(url)
+            self.assertFalse(
+                any(
+                    'COUNT(' in query['sql']
+                    for query in context.captured_queries
+                )
+            )
+            self.assertIsNone(page['count'])
+            self.assertIsNone(page['previous'])
+            ids.extend(recipe['id'] for recipe in page['results'])
+            url = page['next']
+            if url:
+                self.assertNotIn('page=', url)
+        self.assertEqual(ids, self.recipe_ids)
+
+    def test_page_numbers_without_cursor(self):
+        page = self.get('/api/recipes/?limit=2&page=2')
+        self.assertEqual(page['count'], len(self.recipe_ids))
+        self.assertIsNotNone(page['previous'])
+        self.assertEqual(
+            [recipe['id'] for recipe in page['results']],
+            self.recipe_ids[2:4],
+        )
+
+    def test_cursor_is_ignored_for_other_orderings(self):
+        page = self.get('/api/recipes/?cursor=&limit=2&ordering=popular')
+        self.assertEqual(page['count'], len(self.recipe_ids))
+
+    def test_invalid_cursor(self):
+        self.get('/api/recipes/?cursor=abc', status_code=404)
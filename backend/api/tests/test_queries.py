@@ -0,0 +1,110 @@
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCart, Tag)
+from users.models import Subscription
+
+User = get_user_model()
+
+MEDIA_ROOT = tempfile.mkdtemp()
+RECIPES_PER_AUTHOR = 4
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class QueryCountTests(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='reader', email='reader@example.com', password='password'
+        )
+        tags = [
+            Tag.objects.create(name=f'Тег {index}', slug=f'tag{index}')
+            for index in range(3)
+        ]
+        ingredients = [
+            Ingredient.objects.create(
+                name=f'Продукт {index}', measurement_unit='г'
+            )
+            for index in range(4)
+        ]
+        for author_index in range(3):
+            author = User.objects.create_user(
+                username=f'author{author_index}',
+                email=f'author{author_index}@example.com',
+                password='password',
+            )
+            Subscription.objects.create(user=cls.user, author=author)
+            for index in range(RECIPES_PER_AUTHOR):
+                recipe = Recipe.objects.create(
+                    author=author,
+                    name=f'Рецепт {author_index}.{index}',
+                    text='Описание',
+                    cooking_time=10,
+                    image=ContentFile(b'image', name='image.webp'),
+                )
+                recipe.tags.set(tags[:2])
+                RecipeIngredient.objects.bulk_create(
+                    RecipeIngredient(
+                        recipe=recipe, ingredient=ingredient, amount=100
+                    )
+                    for ingredient in ingredients[:3]
+                )
+                if index % 2:
+                    Favorite.objects.create(user=cls.user, recipe=recipe)
+                else:
+                    ShoppingCart.objects.create(user=cls.user, recipe=recipe)
+        cls.recipe = recipe
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response
+
+    def test_recipe_list(self):
+        for limit in (2, 10):
+            with self.subTest(limit=limit):
+                cache.clear()
+                url = f'/api/recipes/?limit={limit}'
+                with self.assertNumQueries(7):
+                    response = self.get(url)
+                self.assertEqual(len(response.json()['results']), limit)
+                with self.assertNumQueries(3):
+                    self.get(url)
+
+    def test_recipe_detail(self):
+        url = f'/api/recipes/{self.recipe.pk}/'
+        with self.assertNumQueries(6):
+            self.get(url)
+        with self.assertNumQueries(2):
+            self.get(url)
+
+    def test_subscriptions(self):
+        for limit in (1, 3):
+            with self.subTest(limit=limit):
+                cache.clear()
+                with self.assertNumQueries(4):
+                    response = self.get(
+                        '/api/users/subscriptions/'
+                        f'?limit={limit}&recipes_limit={limit}'
+                    )
+                results = response.json()['results']
+                self.assertEqual(len(results), limit)
+                self.assertEqual(len(results[0]['recipes']), limit)
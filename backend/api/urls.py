@@ -1,7 +1,10 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from api.views import IngredientViewSet, RecipeViewSet, TagViewSet, UserViewSet
+from api.views import (IngredientViewSet, MetricsView, RecipeViewSet,
+                       TagViewSet, UserViewSet, arecipe_detail, arecipe_list,
+                       ingredient_autocomplete)
 
 v1_router = DefaultRouter()
 
@@ -11,6 +14,17 @@ v1_router.register(r'ingredients', IngredientViewSet)
 v1_router.register(r'recipes', RecipeViewSet)
 
 urlpatterns = [
+    path('_metrics', MetricsView.as_view()),
+]
+
+if settings.SERVER_MODE == 'asgi':
+    urlpatterns += [
+        path('ingredients/', ingredient_autocomplete),
+        path('recipes/', arecipe_list, name='recipe-list'),
+        path('recipes/<int:pk>/', arecipe_detail, name='recipe-detail'),
+    ]
+
+urlpatterns += [
     path('', include(v1_router.urls)),
     path('auth/', include('djoser.urls.authtoken')),
 ]
@@ -1,26 +1,49 @@
+from hashlib import md5
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db.models import Sum
-from django.http import HttpResponse
-from django.shortcuts import get_object_or_404, redirect
-from django.urls import reverse
+from django.db import connection
+from django.db.models import Prefetch, Sum, Value
+from django.http import (Http404, HttpResponse, HttpResponseNotAllowed,
+                         HttpResponseRedirect, StreamingHttpResponse)
+from django.shortcuts import get_object_or_404
+from django.utils.cache import (get_conditional_response, patch_cache_control,
+                                patch_vary_headers)
+from django.utils.http import quote_etag
+from django.views.decorators.http import require_safe
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.serializers import SetPasswordSerializer
-from prettytable import PrettyTable
 from rest_framework import permissions, status
-from rest_framework.decorators import action, api_view
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
 from rest_framework.mixins import CreateModelMixin
+from rest_framework.request import Request
 from rest_framework.response import Response
+from rest_framework.views import APIView
 from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
 
+from api.authentication import aauthenticate, token_cache
+from api.autocomplete import ingredient_index
+from api.bulk import export_recipes, import_recipes
 from api.filters import IngredientFilter, RecipeFilter
-from api.mixins import UserRecipeMixin
-from api.pagination import LimitPageNumberPagination
+from api.metrics import registry, render_prometheus
+from api.mixins import CatalogCacheMixin, UserRecipeMixin, catalog_response
+from api.pagination import LimitPageNumberPagination, RecipesLimitPagination
+from api.parsers import NDJSONParser
 from api.permissions import IsAuthorPermission, PUTMethodPermission
+from api.renderers import (FastJSONRenderer, PrometheusRenderer,
+                           ShoppingListCSVRenderer, ShoppingListJSONRenderer,
+                           ShoppingListRenderer, ShoppingListTextRenderer)
 from api.serializers import (AvatarSerializer, FavoriteSerializer,
-                             IngredientSerializer, RecipeGetSerializer,
+                             IngredientSerializer, MatchedRecipeSerializer,
+                             RecipeGetSerializer, RecipeMatchSerializer,
                              RecipePostSerializer, ShoppingCartSerializer,
                              SubscriptionSerializer, TagSerializer,
                              UserGetSerializer, UserPostSerializer)
+from api.shortlinks import (RECIPE_PAGE_URL, aresolve_short_link,
+                            resolve_short_link, short_link_cache)
+from recipes.matching import recipe_match_index
 from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
                             ShoppingCart, Tag)
 from users.models import Subscription
@@ -45,7 +68,25 @@ class UserViewSet(CreateReadViewSet):
         serializer_class=SubscriptionSerializer,
     )
     def subscriptions(self, request):
-        authors = Subscription.objects.filter(user=request.user)
+        recipes = Recipe.objects.all()
+        recipes_limit = RecipesLimitPagination().get_page_size(request)
+        if recipes_limit:
+            recipes = recipes[:recipes_limit]
+        authors = (
+            Subscription.objects.filter(user=request.user)
+            .prefetch_related(
+                Prefetch(
+                    'author',
+                    queryset=User.objects.annotate(is_subscribed=Value(True)),
+                ),
+                Prefetch(
+                    'author__recipes',
+                    queryset=recipes,
+                    to_attr='limited_recipes',
+                ),
+            )
+            .order_by('-id')
+        )
 
         paginator = LimitPageNumberPagination()
         paginated_authors = paginator.paginate_queryset(
@@ -98,12 +139,13 @@ class UserViewSet(CreateReadViewSet):
     def avatar(self, request):
         user = request.user
         if request.method == 'DELETE':
-            user.avatar.delete()
+            user.avatar.delete(save=False)
+            user.save(update_fields=('avatar',))
             return Response(status=status.HTTP_204_NO_CONTENT)
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         user.avatar = serializer.validated_data.get('avatar')
-        user.save()
+        user.save(update_fields=('avatar',))
         return Response(
             data={'avatar': request.build_absolute_uri(user.avatar.url)}
         )
@@ -121,9 +163,12 @@ class UserViewSet(CreateReadViewSet):
         request.user.set_password(
             serializer.validated_data.get('new_password')
         )
-        request.user.save()
+        request.user.save(update_fields=('password',))
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    def get_queryset(self):
+        return User.objects.with_is_subscribed(self.request.user)
+
     def get_serializer_class(self):
         if self.action == 'create':
             return UserPostSerializer
@@ -135,17 +180,26 @@ class UserViewSet(CreateReadViewSet):
         instance.save()
 
 
-class TagViewSet(ReadOnlyModelViewSet):
+class TagViewSet(CatalogCacheMixin, ReadOnlyModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
 
 
-class IngredientViewSet(ReadOnlyModelViewSet):
+class IngredientViewSet(CatalogCacheMixin, ReadOnlyModelViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     filter_backends = (DjangoFilterBackend,)
     filterset_class = IngredientFilter
 
+    def list(self, request, *args, **kwargs):
+        if request.query_params.get('name'):
+            return self.cached_response(self.autocomplete, request)
+        return super().list(request, *args, **kwargs)
+
+    def autocomplete(self, request):
+        name = request.query_params.get('name')
+        return Response(data=ingredient_index.search(name))
+
 
 class RecipeViewSet(UserRecipeMixin, ModelViewSet):
     queryset = Recipe.objects.all()
@@ -198,39 +252,120 @@ class RecipeViewSet(UserRecipeMixin, ModelViewSet):
             data={'short-link': (f'{scheme}://{host}/s/{recipe.short_link}')}
         )
 
+    @action(
+        methods=('get',),
+        detail=False,
+        url_path='match',
+        serializer_class=MatchedRecipeSerializer,
+    )
+    def match(self, request):
+        serializer = RecipeMatchSerializer(
+            data={'ingredients': request.query_params.getlist('ingredients')}
+        )
+        serializer.is_valid(raise_exception=True)
+        page = self.paginate_queryset(
+            recipe_match_index.match(serializer.validated_data['ingredients'])
+        )
+        recipes = self.get_queryset().in_bulk(
+            [recipe_id for recipe_id, _, _ in page]
+        )
+        matched_recipes = []
+        for recipe_id, matched, total in page:
+            recipe = recipes.get(recipe_id)
+            if recipe is None:
+                continue
+            recipe.coverage = round(matched / total, 4)
+            recipe.missing_count = total - matched
+            matched_recipes.append(recipe)
+        serializer = self.get_serializer(matched_recipes, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(
+        methods=('post',),
+        detail=False,
+        url_path='bulk',
+        permission_classes=(permissions.IsAuthenticated,),
+        parser_classes=(NDJSONParser,),
+    )
+    def bulk(self, request):
+        rows = request.data if not isinstance(request.data, dict) else ()
+        created, errors = import_recipes(rows, request)
+        return Response(
+            {'created': created, 'errors': errors},
+            status=(
+                status.HTTP_201_CREATED
+                if created
+                else status.HTTP_400_BAD_REQUEST
+            ),
+        )
+
+    @bulk.mapping.get
+    def bulk_export(self, request):
+        recipes = self.filter_queryset(Recipe.objects.all())
+        return StreamingHttpResponse(
+            export_recipes(recipes),
+            content_type='application/x-ndjson; charset=utf-8',
+        )
+
     @action(
         methods=('get',),
         detail=False,
         url_path='download_shopping_cart',
         permission_classes=(permissions.IsAuthenticated,),
+        renderer_classes=(
+            ShoppingListTextRenderer,
+            ShoppingListCSVRenderer,
+            ShoppingListJSONRenderer,
+        ),
     )
     def download_shopping_cart(self, request):
-        carts = ShoppingCart.objects.filter(user=request.user)
-        recipes = Recipe.objects.filter(shoppingcarts__in=carts)
-        ingredients = (
-            RecipeIngredient.objects.filter(recipe__in=recipes)
+        ingredients = list(
+            RecipeIngredient.objects.filter(
+                recipe__shoppingcarts__user=request.user
+            )
             .values('ingredient__name', 'ingredient__measurement_unit')
             .annotate(amount_sum=Sum('amount'))
+            .order_by('ingredient__name', 'ingredient__measurement_unit')
         )
+        renderer = request.accepted_renderer
+        etag = quote_etag(
+            md5(
+                f'{renderer.format}:{ingredients}'.encode(),
+                usedforsecurity=False,
+            ).hexdigest()
+        )
+        response = get_conditional_response(request, etag=etag)
+        if response is not None:
+            return response
 
-        table = PrettyTable()
-        table.field_names = ('Название', 'Количество', 'Единицы измерения')
-        for ingredient in ingredients:
-            table.add_row(
-                (
-                    ingredient.get('ingredient__name'),
-                    ingredient.get('amount_sum'),
-                    ingredient.get('ingredient__measurement_unit'),
-                )
-            )
-
-        response = HttpResponse(content_type='text/plain')
+        response = StreamingHttpResponse(
+            renderer.stream(ingredients),
+            content_type=f'{renderer.media_type}; charset={renderer.charset}',
+        )
         response['Content-Disposition'] = (
-            'attachment; filename="shopping_list.txt"'
+            f'attachment; filename="shopping_list.{renderer.format}"'
+        )
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, no-cache'
+        return response
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs
         )
-        response.write(table.get_string())
+        if isinstance(response, Response) and isinstance(
+            response.accepted_renderer, ShoppingListRenderer
+        ):
+            # Ошибки, в том числе 404 для неизвестного format, отдаются
+            # обычным JSON, а не в формате списка покупок.
+            renderer = FastJSONRenderer()
+            response.accepted_renderer = renderer
+            response.accepted_media_type = renderer.media_type
         return response
 
+    def get_queryset(self):
+        return Recipe.objects.with_user_flags(self.request.user)
+
     def get_permissions(self):
         if self.action in ('partial_update', 'destroy'):
             return (IsAuthorPermission(),)
@@ -244,10 +379,178 @@ class RecipeViewSet(UserRecipeMixin, ModelViewSet):
         return super().get_serializer_class()
 
 
-@api_view(('get',))
+class MetricsView(APIView):
+    """Показатели запросов к API в формате Prometheus."""
+
+    permission_classes = (permissions.IsAdminUser,)
+    renderer_classes = (PrometheusRenderer,)
+
+    def get(self, request):
+        return Response(
+            render_prometheus(
+                registry.collect(),
+                {
+                    'auth_token': token_cache.stats(),
+                    'short_link': short_link_cache.stats(),
+                },
+            )
+        )
+
+
+ingredient_list = IngredientViewSet.as_view({'get': 'list'})
+
+
+async def ingredient_autocomplete(request):
+    """Асинхронное автодополнение ингредиентов по параметру name.
+
+    Подключается только при SERVER_MODE=asgi: под WSGI каждый вызов
+    асинхронного view запускает свой цикл событий, и IngredientViewSet
+    там быстрее. Остальные запросы, в том числе к браузерному API,
+    обрабатывает IngredientViewSet.
+    """
+    name = request.GET.get('name')
+    if (
+        request.method != 'GET'
+        or not name
+        or 'text/html' in request.headers.get('Accept', '')
+    ):
+        return await sync_to_async(ingredient_list)(request)
+    renderer = FastJSONRenderer()
+    return catalog_response(
+        request,
+        renderer.render(await ingredient_index.asearch(name)),
+        f'{renderer.media_type}; charset=utf-8',
+    )
+
+
+ingredient_autocomplete.csrf_exempt = True
+
+
+recipe_list = RecipeViewSet.as_view({'get': 'list', 'post': 'create'})
+recipe_detail = RecipeViewSet.as_view(
+    {
+        'get': 'retrieve',
+        'put': 'update',
+        'patch': 'partial_update',
+        'delete': 'destroy',
+    }
+)
+
+
+async def aget_reader(request):
+    """Пользователь для асинхронного чтения рецептов или None.
+
+    None означает, что запрос обрабатывает RecipeViewSet: это запись,
+    браузерный API, выбор формата или токен, которого нет в кеше.
+    """
+    if (
+        request.method != 'GET'
+        or 'format' in request.GET
+        or 'text/html' in request.headers.get('Accept', '')
+    ):
+        return None
+    return await aauthenticate(request)
+
+
+def json_response(data):
+    renderer = FastJSONRenderer()
+    response = HttpResponse(
+        renderer.render(data), content_type=renderer.media_type
+    )
+    patch_vary_headers(response, ('Accept',))
+    return response
+
+
+async def arecipe_list(request):
+    """Асинхронный список рецептов для SERVER_MODE=asgi.
+
+    Количество и страница рецептов читаются асинхронным ORM, а в поток
+    уходит только сборка ответа из кеша фрагментов. Ошибки фильтров и
+    пагинации, а также поиск без PostgreSQL, который читает индекс
+    синхронно, обрабатывает RecipeViewSet.
+    """
+    user = await aget_reader(request)
+    if user is None or (
+        'search' in request.GET and connection.vendor != 'postgresql'
+    ):
+        return await sync_to_async(recipe_list)(request)
+    api_request = Request(request)
+    api_request.user = user
+    filterset = RecipeFilter(
+        api_request.query_params,
+        queryset=Recipe.objects.with_user_flags(user),
+        request=api_request,
+    )
+    if not filterset.is_valid():
+        return await sync_to_async(recipe_list)(request)
+    paginator = LimitPageNumberPagination()
+    try:
+        page = await paginator.apaginate_queryset(filterset.qs, api_request)
+    except NotFound:
+        return await sync_to_async(recipe_list)(request)
+    serializer = RecipeGetSerializer(
+        page, many=True, context={'request': api_request}
+    )
+    data = await sync_to_async(lambda: serializer.data)()
+    return json_response(paginator.get_paginated_response(data).data)
+
+
+async def arecipe_detail(request, pk):
+    """Асинхронный рецепт для SERVER_MODE=asgi.
+
+    Запросы с параметрами фильтров и отсутствующие рецепты обрабатывает
+    RecipeViewSet.
+    """
+    user = await aget_reader(request)
+    recipe = None
+    if user is not None and not request.GET:
+        recipe = await (
+            Recipe.objects.with_user_flags(user).filter(pk=pk).afirst()
+        )
+    if recipe is None:
+        return await sync_to_async(recipe_detail)(request, pk=pk)
+    api_request = Request(request)
+    api_request.user = user
+    serializer = RecipeGetSerializer(recipe, context={'request': api_request})
+    return json_response(await sync_to_async(lambda: serializer.data)())
+
+
+# Действия для меток метрик, как у RecipeViewSet.
+arecipe_list.actions = recipe_list.actions
+arecipe_detail.actions = recipe_detail.actions
+arecipe_list.csrf_exempt = arecipe_detail.csrf_exempt = True
+
+
+def recipe_redirect(request, recipe_id):
+    response = HttpResponseRedirect(
+        request.build_absolute_uri(RECIPE_PAGE_URL.format(pk=recipe_id))
+    )
+    patch_cache_control(
+        response, public=True, max_age=settings.SHORT_LINK_CACHE['MAX_AGE']
+    )
+    return response
+
+
+@require_safe
 def get_recipe_by_link(request, shortlink):
-    recipe = get_object_or_404(Recipe, short_link=shortlink)
-    recipe_url = request.build_absolute_uri(
-        reverse('recipe-detail', kwargs={'pk': recipe.pk})
-    ).replace('api/', '')
-    return redirect(recipe_url)
+    """Перенаправляет короткую ссылку на страницу рецепта."""
+    recipe_id = short_link_cache.get(shortlink)
+    if recipe_id is None:
+        recipe_id = resolve_short_link(shortlink)
+        if recipe_id is None:
+            raise Http404('Рецепт не найден.')
+        short_link_cache.set(shortlink, recipe_id)
+    return recipe_redirect(request, recipe_id)
+
+
+async def aget_recipe_by_link(request, shortlink):
+    """Асинхронный вариант get_recipe_by_link для SERVER_MODE=asgi."""
+    if request.method not in ('GET', 'HEAD'):
+        return HttpResponseNotAllowed(('GET', 'HEAD'))
+    recipe_id = await short_link_cache.aget(shortlink)
+    if recipe_id is None:
+        recipe_id = await aresolve_short_link(shortlink)
+        if recipe_id is None:
+            raise Http404('Рецепт не найден.')
+        await short_link_cache.aset(shortlink, recipe_id)
+    return recipe_redirect(request, recipe_id)
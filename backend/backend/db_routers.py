@@ -0,0 +1,150 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from hashlib import sha256
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+STICKY_COOKIE_NAME = 'use_primary_db'
+STICKY_KEY = 'use_primary_db:{digest}'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+replica_reads_allowed = ContextVar('replica_reads_allowed', default=False)
+
+
+def get_replicas():
+    return [alias for alias in settings.DATABASES if alias != DEFAULT_DB_ALIAS]
+
+
+@contextmanager
+def primary_reads():
+    """Направляет чтение внутри блока в основную базу.
+
+    Нужен при пересборке кешей: первое чтение после повышения версии
+    может прийти на отстающую реплику, и старые данные закрепятся
+    в кеше под новой версией.
+    """
+    token = replica_reads_allowed.set(False)
+    try:
+        yield
+    finally:
+        replica_reads_allowed.reset(token)
+
+
+def get_sticky_key(request):
+    """Ключ признака недавней записи для клиента с токеном."""
+    authorization = request.META.get('HTTP_AUTHORIZATION')
+    if not authorization:
+        return None
+    return STICKY_KEY.format(
+        digest=sha256(authorization.encode()).hexdigest()
+    )
+
+
+class PrimaryReplicaRouter:
+    """Направляет чтение на реплики, а запись на основную базу.
+
+    Реплики используются, только если это разрешил
+    ReplicaRoutingMiddleware. Вне запросов (команды, фоновые потоки),
+    внутри транзакции и после первой записи в запросе чтение идёт
+    в основную базу.
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = get_replicas()
+        if (
+            not replicas
+            or not replica_reads_allowed.get()
+            or connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        replica_reads_allowed.set(False)
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaRoutingMiddleware:
+    """Разрешает чтение с реплик для безопасных запросов.
+
+    После изменяющего запроса на время DB_REPLICA_STICKY_SECONDS запросы
+    клиента читают из основной базы, чтобы он видел свои изменения
+    несмотря на отставание реплик. Браузер получает cookie, а для
+    клиентов с токеном, которые cookie не передают, признак хранится
+    в общем кеше по хешу заголовка Authorization.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        allowed = self.may_use_replicas(request)
+        sticky_key = get_sticky_key(request)
+        if allowed and sticky_key is not None:
+            allowed = cache.get(sticky_key) is None
+        token = replica_reads_allowed.set(allowed)
+        try:
+            response = self.get_response(request)
+        finally:
+            replica_reads_allowed.reset(token)
+        if self.is_write(request):
+            self.set_sticky_cookie(response)
+            if sticky_key is not None:
+                cache.set(
+                    sticky_key, True, settings.DB_REPLICA_STICKY_SECONDS
+                )
+        return response
+
+    async def __acall__(self, request):
+        allowed = self.may_use_replicas(request)
+        sticky_key = get_sticky_key(request)
+        if allowed and sticky_key is not None:
+            allowed = await cache.aget(sticky_key) is None
+        token = replica_reads_allowed.set(allowed)
+        try:
+            response = await self.get_response(request)
+        finally:
+            replica_reads_allowed.reset(token)
+        if self.is_write(request):
+            self.set_sticky_cookie(response)
+            if sticky_key is not None:
+                await cache.aset(
+                    sticky_key, True, settings.DB_REPLICA_STICKY_SECONDS
+                )
+        return response
+
+    def may_use_replicas(self, request):
+        return (
+            request.method in SAFE_METHODS
+            and STICKY_COOKIE_NAME not in request.COOKIES
+            and bool(get_replicas())
+        )
+
+    def is_write(self, request):
+        return request.method not in SAFE_METHODS and bool(get_replicas())
+
+    def set_sticky_cookie(self, response):
+        response.set_cookie(
+            STICKY_COOKIE_NAME,
+            '1',
+            max_age=settings.DB_REPLICA_STICKY_SECONDS,
+            httponly=True,
+            samesite='Lax',
+        )
@@ -27,6 +27,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'api.metrics.RequestMetricsMiddleware',
+    'backend.db_routers.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -55,6 +57,9 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'backend.wsgi.application'
 
+# wsgi или asgi, тот же параметр читает gunicorn.conf.py.
+SERVER_MODE = os.getenv('SERVER_MODE', 'wsgi')
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.postgresql',
@@ -63,9 +68,54 @@ DATABASES = {
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
         'HOST': os.getenv('DB_HOST', ''),
         'PORT': os.getenv('DB_PORT', 5432),
+        # В режиме ASGI каждый запрос выполняется в новом потоке,
+        # поэтому постоянные соединения там только накапливаются.
+        'CONN_MAX_AGE': int(
+            os.getenv(
+                'DB_CONN_MAX_AGE',
+                0 if SERVER_MODE == 'asgi' else 60,
+            )
+        ),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+for index, replica_host in enumerate(
+    os.getenv('DB_REPLICA_HOSTS', '').split(), start=1
+):
+    host, _, port = replica_host.partition(':')
+    DATABASES[f'replica_{index}'] = DATABASES['default'] | {
+        'HOST': host,
+        'PORT': port or DATABASES['default']['PORT'],
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ('backend.db_routers.PrimaryReplicaRouter',)
+
+DB_REPLICA_STICKY_SECONDS = int(os.getenv('DB_REPLICA_STICKY_SECONDS', 10))
+
+# Версии и фрагменты в кеше должны быть общими для всех процессов
+# gunicorn и команд управления, поэтому в docker compose CACHE_URL
+# указывает на Redis. Кеш в БД не используется: каждое чтение из него
+# было бы запросом к той же базе. LocMemCache без CACHE_URL подходит
+# только для одного процесса (разработка, тесты), о чём предупреждает
+# проверка api.W001.
+CACHE_URL = os.getenv('CACHE_URL', '')
+
+if CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -103,8 +153,45 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'api.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
+}
+
+# Отозванный токен принимается другими процессами gunicorn ещё до
+# LOCAL_TIMEOUT секунд: столько живёт запись в памяти процесса. TIMEOUT
+# относится к общему кешу, который очищается при отзыве сразу.
+AUTH_TOKEN_CACHE = {
+    'MAX_SIZE': int(os.getenv('AUTH_TOKEN_CACHE_MAX_SIZE', 1024)),
+    'TIMEOUT': int(os.getenv('AUTH_TOKEN_CACHE_TIMEOUT', 60)),
+    'LOCAL_TIMEOUT': int(os.getenv('AUTH_TOKEN_CACHE_LOCAL_TIMEOUT', 5)),
+    'USE_SHARED_CACHE': os.getenv('AUTH_TOKEN_CACHE_SHARED', 'False') == 'True',
+}
+
+# Ключ перестановки id в коротких ссылках. После выдачи ссылок его
+# нельзя менять: прежние ссылки перестанут открываться.
+SHORT_LINK_SECRET = os.getenv('SHORT_LINK_SECRET', '')
+
+SHORT_LINK_CACHE = {
+    'MAX_SIZE': int(os.getenv('SHORT_LINK_CACHE_MAX_SIZE', 10000)),
+    'TIMEOUT': int(os.getenv('SHORT_LINK_CACHE_TIMEOUT', 60 * 60)),
+    'LOCAL_TIMEOUT': int(os.getenv('SHORT_LINK_CACHE_LOCAL_TIMEOUT', 5)),
+    'USE_SHARED_CACHE': os.getenv('SHORT_LINK_CACHE_SHARED', 'False') == 'True',
+    'MAX_AGE': int(os.getenv('SHORT_LINK_MAX_AGE', 60 * 60)),
+}
+
+REQUEST_METRICS = {
+    'ENABLED': os.getenv('REQUEST_METRICS', 'True') == 'True',
+    'SERVER_TIMING': os.getenv('SERVER_TIMING', str(DEBUG)) == 'True',
+    'WINDOW': int(os.getenv('REQUEST_METRICS_WINDOW', 5 * 60)),
 }
 
 DJOSER = {'LOGIN_FIELD': 'email'}
@@ -1,10 +1,16 @@
+from django.conf import settings
 from django.contrib import admin
 from django.urls import include, path
 
-from api.views import get_recipe_by_link
+from api.views import aget_recipe_by_link, get_recipe_by_link
 
 urlpatterns = [
     path('admin/', admin.site.urls),
     path('api/', include('api.urls')),
-    path('s/<str:shortlink>/', get_recipe_by_link),
+    path(
+        's/<str:shortlink>/',
+        aget_recipe_by_link
+        if settings.SERVER_MODE == 'asgi'
+        else get_recipe_by_link,
+    ),
 ]
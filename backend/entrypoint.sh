@@ -6,4 +6,4 @@ cp -r /app/collected_static/. /backend_static/static/
 
 python manage.py migrate
 
-gunicorn --bind 0.0.0.0:8000 backend.wsgi
\ No newline at end of file
+exec gunicorn --config gunicorn.conf.py
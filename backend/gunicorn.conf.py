@@ -0,0 +1,89 @@
+import multiprocessing
+import os
+
+SERVER_MODE = os.getenv('SERVER_MODE', 'wsgi')
+MAX_DEFAULT_WORKERS = int(os.getenv('GUNICORN_MAX_WORKERS', 8))
+# max_connections PostgreSQL (по умолчанию 100) без соединений для
+# суперпользователя, миграций, команд управления и админки.
+DB_MAX_CONNECTIONS = int(os.getenv('DB_MAX_CONNECTIONS', 100))
+DB_RESERVED_CONNECTIONS = int(os.getenv('DB_RESERVED_CONNECTIONS', 10))
+
+
+def get_cpu_count():
+    """Число CPU, на которых процессу разрешено выполняться.
+
+    multiprocessing.cpu_count() возвращает все CPU хоста, даже если
+    контейнер ограничен cpuset. Квоту docker --cpus не видно и здесь,
+    поэтому при ней число воркеров задаётся через GUNICORN_WORKERS.
+    """
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return multiprocessing.cpu_count()
+
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+# Размер пула ограничен соединениями с БД, а не только CPU. При
+# CONN_MAX_AGE > 0 каждый поток воркера держит открытым своё соединение
+# с основной базой и с каждой репликой, из которой читал, поэтому на
+# каждом сервере PostgreSQL одновременно открыто до
+# workers * threads * число экземпляров бэкенда соединений. Это число
+# должно быть меньше DB_MAX_CONNECTIONS - DB_RESERVED_CONNECTIONS. В
+# режиме ASGI CONN_MAX_AGE = 0 и соединение открывается на время
+# запроса, но пиковое число соединений оценивается так же.
+workers = int(
+    os.getenv(
+        'GUNICORN_WORKERS', min(get_cpu_count() * 2 + 1, MAX_DEFAULT_WORKERS)
+    )
+)
+threads = int(os.getenv('GUNICORN_THREADS', 1))
+if SERVER_MODE == 'asgi':
+    wsgi_app = 'backend.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+else:
+    wsgi_app = 'backend.wsgi:application'
+    # Потоки делят память процесса, но каждый держит своё соединение
+    # с БД: всего их будет до workers * threads.
+    worker_class = 'gthread' if threads > 1 else 'sync'
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 100))
+preload_app = os.getenv('GUNICORN_PRELOAD', 'True') == 'True'
+accesslog = '-'
+
+
+def on_starting(server):
+    connections = workers * threads
+    available = DB_MAX_CONNECTIONS - DB_RESERVED_CONNECTIONS
+    if connections > available:
+        server.log.warning(
+            'Воркерам может понадобиться %s соединений с БД, а доступно %s. '
+            'Уменьшите GUNICORN_WORKERS или GUNICORN_THREADS либо '
+            'увеличьте max_connections.',
+            connections,
+            available,
+        )
+
+
+def close_db_connections():
+    from django.db import connections
+
+    for connection in connections.all(initialized_only=True):
+        connection.close()
+
+
+def pre_fork(server, worker):
+    """Закрывает соединения мастер-процесса перед запуском воркера.
+
+    При preload_app приложение загружается до fork, и соединение,
+    открытое при загрузке, досталось бы всем воркерам. Мастер запросы
+    не обрабатывает, поэтому соединение ему не нужно.
+    """
+    close_db_connections()
+
+
+def post_fork(server, worker):
+    """Закрывает соединения, если воркер всё же унаследовал их от мастера."""
+    close_db_connections()
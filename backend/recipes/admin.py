@@ -1,7 +1,9 @@
 from django.contrib import admin
 
+from recipes.images import schedule_thumbnails
 from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
                             ShoppingCart, Tag)
+from recipes.search import update_search_vector
 
 
 @admin.register(Tag)
@@ -18,9 +20,18 @@ class IngredientAdmin(admin.ModelAdmin):
 
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
-    list_display = ('name', 'author')
+    list_display = ('name', 'author', 'favorites_count', 'in_carts_count')
     search_fields = ('name', 'author__username')
     list_filter = ('tags',)
+    readonly_fields = ('image_small', 'image_large')
+
+    def save_model(self, request, obj, form, change):
+        if 'image' in form.changed_data:
+            obj.image_small = obj.image_large = ''
+        super().save_model(request, obj, form, change)
+        update_search_vector(obj)
+        if 'image' in form.changed_data:
+            schedule_thumbnails(obj)
 
 
 @admin.register(RecipeIngredient)
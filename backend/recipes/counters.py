@@ -0,0 +1,48 @@
+from django.contrib.auth import get_user_model
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import Subscription
+
+User = get_user_model()
+
+COUNTERS = {
+    Favorite: (Recipe, 'recipe_id', 'favorites_count'),
+    ShoppingCart: (Recipe, 'recipe_id', 'in_carts_count'),
+    Recipe: (User, 'author_id', 'recipes_count'),
+    Subscription: (User, 'author_id', 'subscribers_count'),
+}
+
+
+def update_counter(sender, instance, delta):
+    model, foreign_key, field = COUNTERS[sender]
+    queryset = model.objects.filter(pk=getattr(instance, foreign_key))
+    if delta < 0:
+        queryset = queryset.filter(**{f'{field}__gte': -delta})
+    queryset.update(**{field: F(field) + delta})
+
+
+def recount_counters():
+    """Пересчитывает счётчики, разошедшиеся с данными.
+
+    Возвращает количество исправленных записей для каждого счётчика.
+    """
+    fixed = {}
+    for counted_model, (model, foreign_key, field) in COUNTERS.items():
+        actual = Coalesce(
+            Subquery(
+                counted_model.objects.filter(**{foreign_key: OuterRef('pk')})
+                .order_by()
+                .values(foreign_key)
+                .annotate(total=Count('pk'))
+                .values('total')
+            ),
+            0,
+        )
+        fixed[f'{model.__name__}.{field}'] = (
+            model.objects.annotate(actual=actual)
+            .exclude(**{field: F('actual')})
+            .update(**{field: actual})
+        )
+    return fixed
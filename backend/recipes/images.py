@@ -0,0 +1,66 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from pathlib import Path
+
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from PIL import Image
+
+from recipes.models import Recipe
+from recipes.signals import thumbnails_created
+
+logger = logging.getLogger(__name__)
+
+THUMBNAIL_SIZES = {
+    'image_small': (320, 320),
+    'image_large': (960, 960),
+}
+THUMBNAIL_FORMAT = 'WEBP'
+THUMBNAIL_QUALITY = 80
+
+executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='thumbnails')
+
+
+def make_thumbnails(recipe_id):
+    close_old_connections()
+    try:
+        recipe = Recipe.objects.get(pk=recipe_id)
+        with recipe.image.open('rb') as file, Image.open(file) as source:
+            source.load()
+            stem = Path(recipe.image.name).stem
+            thumbnails = {}
+            for field, size in THUMBNAIL_SIZES.items():
+                image = source.copy()
+                image.thumbnail(size)
+                output = BytesIO()
+                image.save(
+                    output, THUMBNAIL_FORMAT, quality=THUMBNAIL_QUALITY
+                )
+                thumbnail = getattr(recipe, field)
+                thumbnail.save(
+                    f'{stem}_{size[0]}.{THUMBNAIL_FORMAT.lower()}',
+                    ContentFile(output.getvalue()),
+                    save=False,
+                )
+                thumbnails[field] = thumbnail.name
+        updated = Recipe.objects.filter(
+            pk=recipe_id, image=recipe.image.name
+        ).update(**thumbnails)
+        if updated:
+            thumbnails_created.send(sender=Recipe, recipe_id=recipe_id)
+    except Exception:
+        logger.exception(
+            'Не удалось создать миниатюры рецепта %s.', recipe_id
+        )
+    finally:
+        close_old_connections()
+
+
+def schedule_thumbnails(recipe):
+    """Создаёт миниатюры изображения рецепта в фоновом потоке.
+
+    Задача ставится после фиксации транзакции, чтобы поток увидел рецепт.
+    """
+    recipe_id = recipe.pk
+    transaction.on_commit(lambda: executor.submit(make_thumbnails, recipe_id))
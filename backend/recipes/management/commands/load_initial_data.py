@@ -1,19 +1,184 @@
+import csv
 import json
+import time
+from pathlib import Path
 
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
 
 from recipes.models import Ingredient, Tag
+from recipes.signals import catalog_imported
 
-MODELS_FILES = ((Ingredient, 'data/ingredients.json'), (Tag, 'data/tags.json'))
+MODELS_FILES = (
+    (Ingredient, 'data/ingredients', ('name', 'measurement_unit')),
+    (Tag, 'data/tags', ('name', 'slug')),
+)
+UPSERT_OPTIONS = {
+    Ingredient: {'ignore_conflicts': True},
+    Tag: {
+        'update_conflicts': True,
+        'unique_fields': ('slug',),
+        'update_fields': ('name',),
+    },
+}
+READ_CHUNK_SIZE = 64 * 1024
+
+
+def read_json(file, fields):
+    """Построчно разбирает JSON-массив объектов, не читая файл целиком."""
+    decoder = json.JSONDecoder()
+    buffer, position, finished = '', 0, False
+    started = False
+    while True:
+        while position < len(buffer) and buffer[position] in ' \t\r\n,':
+            position += 1
+        if not started and position < len(buffer):
+            if buffer[position] != '[':
+                raise CommandError('Ожидался JSON-массив.')
+            started = True
+            position += 1
+            continue
+        if started and buffer.startswith(']', position):
+            return
+        if position < len(buffer):
+            try:
+                item, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if finished:
+                    raise CommandError('Некорректный JSON.')
+            else:
+                yield {field: item[field] for field in fields}
+                position = end
+                continue
+        elif finished:
+            raise CommandError('Неожиданный конец файла.')
+        chunk = file.read(READ_CHUNK_SIZE)
+        finished = not chunk
+        buffer = buffer[position:] + chunk
+        position = 0
+
+
+def read_csv(file, fields):
+    for row in csv.reader(file):
+        if row:
+            yield dict(zip(fields, row))
+
+
+READERS = {'json': read_json, 'csv': read_csv}
 
 
 class Command(BaseCommand):
-    help = 'Импорт данных из json файлов.'
+    help = 'Импорт ингредиентов и тегов из json или csv файлов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--format',
+            choices=tuple(READERS),
+            default='json',
+            help='Формат файлов с данными.',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Количество записей в одном запросе к БД.',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Выполнить импорт и откатить изменения.',
+        )
 
     def handle(self, *args, **options):
-        for model, json_file in MODELS_FILES:
-            with open(json_file, 'r') as file:
-                data = json.load(file)
-                model.objects.all().delete()
-                for item in data:
-                    model.objects.create(**item)
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть больше нуля.')
+        with transaction.atomic():
+            for model, path, fields in MODELS_FILES:
+                file_path = Path(f'{path}.{options["format"]}')
+                if not file_path.exists():
+                    self.stderr.write(
+                        self.style.WARNING(f'Файл {file_path} не найден.')
+                    )
+                    continue
+                self.load(model, file_path, fields, options)
+            if options['dry_run']:
+                transaction.set_rollback(True)
+        if options['dry_run']:
+            self.stdout.write('Пробный запуск: изменения отменены.')
+        else:
+            catalog_imported.send(sender=self.__class__)
+
+    def load(self, model, file_path, fields, options):
+        reader = READERS[options['format']]
+        batch_size = options['batch_size']
+        started = time.monotonic()
+        count = 0
+        with open(file_path, 'r', encoding='utf-8', newline='') as file:
+            batch = []
+            for item in reader(file, fields):
+                batch.append(model(**item))
+                if len(batch) == batch_size:
+                    count += self.save(model, batch)
+                    batch = []
+            count += self.save(model, batch)
+        elapsed = max(time.monotonic() - started, 1e-9)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'{model._meta.verbose_name_plural}: {count} записей из '
+                f'{file_path} за {elapsed:.2f} с '
+                f'({count / elapsed:.0f} записей/с).'
+            )
+        )
+
+    def save(self, model, batch):
+        if batch:
+            self.check_conflicts(model, batch)
+            model.objects.bulk_create(batch, **UPSERT_OPTIONS[model])
+        return len(batch)
+
+    def check_conflicts(self, model, batch):
+        """Проверяет уникальные поля, по которым upsert не разрешает конфликт.
+
+        Конфликт по unique_fields обновляет запись, а совпадение другого
+        уникального поля, например названия тега с другим слагом, или
+        повтор ключа в одном запросе вызывает ошибку БД.
+        """
+        options = UPSERT_OPTIONS[model]
+        if not options.get('update_conflicts'):
+            return
+        (key,) = options['unique_fields']
+        keys = [getattr(item, key) for item in batch]
+        if len(keys) != len(set(keys)):
+            raise CommandError(
+                f'{model._meta.verbose_name_plural}: значения поля {key} '
+                f'повторяются.'
+            )
+        for field in options['update_fields']:
+            if not model._meta.get_field(field).unique:
+                continue
+            new_keys = {}
+            for item in batch:
+                if new_keys.setdefault(
+                    getattr(item, field), getattr(item, key)
+                ) != getattr(item, key):
+                    raise CommandError(
+                        f'{model._meta.verbose_name_plural}: значение '
+                        f'{getattr(item, field)!r} поля {field} повторяется.'
+                    )
+            conflicts = [
+                (value, old_key, new_keys[value])
+                for value, old_key in model.objects.filter(
+                    **{f'{field}__in': new_keys}
+                ).values_list(field, key)
+                if old_key != new_keys[value]
+            ]
+            if conflicts:
+                raise CommandError(
+                    '\n'.join(
+                        f'{model._meta.verbose_name_plural}: значение '
+                        f'{value!r} поля {field} уже есть у записи '
+                        f'{key}={old_key!r}, а в файле указано для '
+                        f'{key}={new_key!r}.'
+                        for value, old_key, new_key in conflicts
+                    )
+                )
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.counters import recount_counters
+
+
+class Command(BaseCommand):
+    help = 'Пересчёт счётчиков избранного, корзин, рецептов и подписчиков.'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            fixed = recount_counters()
+        for counter, count in fixed.items():
+            self.stdout.write(f'{counter}: исправлено записей: {count}.')
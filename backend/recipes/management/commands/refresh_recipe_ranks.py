@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from recipes.ranking import refresh_ranks
+
+
+class Command(BaseCommand):
+    help = (
+        'Обновление рейтингов рецептов для сортировки popular и trending. '
+        'Рассчитана на периодический запуск, например из cron.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--full',
+            action='store_true',
+            help='Пересчитать рейтинги с нуля с учётом удалений.',
+        )
+
+    def handle(self, *args, **options):
+        updated = refresh_ranks(full=options['full'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Обновлено рейтингов рецептов: {updated}.')
+        )
@@ -0,0 +1,291 @@
+import time
+from collections import defaultdict
+from threading import Lock, local
+
+from django.core.cache import cache
+from django.db import transaction
+
+from backend.db_routers import primary_reads
+from recipes.models import RecipeIngredient
+
+MATCH_VERSION_KEY = 'recipe_match_version'
+MATCH_CHANGES_KEY = 'recipe_match_changes:{version}'
+MATCH_CHANGES_TIMEOUT = 60 * 60
+# Если процесс отстал больше чем на столько версий, индекс перечитывается
+# целиком, а не по журналу изменений.
+MAX_REPLAYED_VERSIONS = 100
+
+
+def popcount(bits):
+    return bin(bits).count('1')
+
+
+def to_bitset(positions, size):
+    buffer = bytearray(size // 8 + 1)
+    for position in positions:
+        buffer[position >> 3] |= 1 << (position & 7)
+    return int.from_bytes(buffer, 'little')
+
+
+def get_match_version():
+    return cache.get_or_set(
+        MATCH_VERSION_KEY, lambda: time.time_ns(), timeout=None
+    )
+
+
+def bump_match_version():
+    try:
+        return cache.incr(MATCH_VERSION_KEY)
+    except ValueError:
+        version = time.time_ns()
+        cache.set(MATCH_VERSION_KEY, version, timeout=None)
+        return version
+
+
+class MatchResults:
+    """Ленивая последовательность результатов подбора для пагинатора."""
+
+    def __init__(self, index, ingredient_ids):
+        self.index = index
+        self.planes, self.union = index.count_matches(ingredient_ids)
+        self.total = popcount(self.union)
+        self.max_matches = min(
+            len(set(ingredient_ids)), (1 << len(self.planes)) - 1
+        )
+
+    def __len__(self):
+        return self.total
+
+    def __getitem__(self, page):
+        return self.index.collect(
+            self.planes, self.union, self.max_matches, page.start, page.stop
+        )
+
+
+class RecipeMatchIndex:
+    """Инвертированный индекс «ингредиент → рецепты» в памяти процесса.
+
+    Каждому рецепту соответствует позиция в порядке возрастания id, а
+    каждому ингредиенту — битовая маска рецептов, в которых он есть.
+    Число совпавших ингредиентов считается сложением масок в двоичных
+    разрядах (по маске на разряд), поэтому работа над всеми рецептами
+    выполняется целочисленными операциями Python без цикла по рецептам.
+
+    Изменённые в транзакции рецепты собираются и после фиксации
+    перечитываются из БД одним запросом. Результат получает новую версию
+    и сохраняется в общем кеше как журнал изменений, по которому
+    остальные процессы обновляют свои индексы без полной загрузки.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._pending = local()
+        self._loaded = False
+        self._version = None
+
+    def load(self, version):
+        recipe_ingredients = defaultdict(set)
+        with primary_reads():
+            for recipe_id, ingredient_id in (
+                RecipeIngredient.objects.values_list(
+                    'recipe_id', 'ingredient_id'
+                ).iterator()
+            ):
+                recipe_ingredients[recipe_id].add(ingredient_id)
+        recipe_ids = sorted(recipe_ingredients)
+        positions = defaultdict(list)
+        sizes = defaultdict(list)
+        for position, recipe_id in enumerate(recipe_ids):
+            ingredient_ids = recipe_ingredients[recipe_id]
+            sizes[len(ingredient_ids)].append(position)
+            for ingredient_id in ingredient_ids:
+                positions[ingredient_id].append(position)
+        total = len(recipe_ids)
+        with self._lock:
+            self._recipe_ids = recipe_ids
+            self._positions = {
+                recipe_id: position
+                for position, recipe_id in enumerate(recipe_ids)
+            }
+            self._ingredients = [
+                frozenset(recipe_ingredients[recipe_id])
+                for recipe_id in recipe_ids
+            ]
+            self._postings = {
+                ingredient_id: to_bitset(ingredient_positions, total)
+                for ingredient_id, ingredient_positions in positions.items()
+            }
+            self._sizes = {
+                size: to_bitset(size_positions, total)
+                for size, size_positions in sizes.items()
+            }
+            self._loaded, self._version = True, version
+
+    def ensure_loaded(self):
+        version = get_match_version()
+        with self._lock:
+            current = self._version if self._loaded else None
+        if current == version:
+            return
+        if current is not None and 0 < version - current <= (
+            MAX_REPLAYED_VERSIONS
+        ):
+            keys = [
+                MATCH_CHANGES_KEY.format(version=replayed)
+                for replayed in range(current + 1, version + 1)
+            ]
+            changes = cache.get_many(keys)
+            if len(changes) == len(keys):
+                with self._lock:
+                    if self._version == current:
+                        for key in keys:
+                            for recipe_id, ingredient_ids in changes[
+                                key
+                            ].items():
+                                self._apply(recipe_id, ingredient_ids)
+                        self._version = version
+                return
+        self.load(version)
+
+    def _set(self, position, ingredient_ids, enabled):
+        bit = 1 << position
+        for ingredient_id in ingredient_ids:
+            self._postings[ingredient_id] = (
+                self._postings.get(ingredient_id, 0) | bit
+                if enabled
+                else self._postings.get(ingredient_id, 0) & ~bit
+            )
+        size = len(ingredient_ids)
+        if size:
+            self._sizes[size] = (
+                self._sizes.get(size, 0) | bit
+                if enabled
+                else self._sizes.get(size, 0) & ~bit
+            )
+
+    def _apply(self, recipe_id, ingredient_ids):
+        position = self._positions.get(recipe_id)
+        if position is None:
+            if not ingredient_ids:
+                return
+            position = len(self._recipe_ids)
+            self._positions[recipe_id] = position
+            self._recipe_ids.append(recipe_id)
+            self._ingredients.append(frozenset())
+        self._set(position, self._ingredients[position], False)
+        self._ingredients[position] = frozenset(ingredient_ids)
+        self._set(position, self._ingredients[position], True)
+
+    def schedule(self, *recipe_ids):
+        """Обновляет рецепты в индексе после фиксации транзакции.
+
+        Рецепты из отменённой транзакции перечитываются вместе со
+        следующей, что ничего не меняет.
+        """
+        pending = getattr(self._pending, 'recipe_ids', None)
+        if pending is None:
+            pending = self._pending.recipe_ids = set()
+        pending.update(recipe_ids)
+        transaction.on_commit(self.flush)
+
+    def flush(self):
+        recipe_ids = getattr(self._pending, 'recipe_ids', None)
+        if not recipe_ids:
+            return
+        self._pending.recipe_ids = set()
+        # Версия берётся до чтения, поэтому изменение с большей версией
+        # прочитано не раньше изменений с меньшими.
+        version = bump_match_version()
+        changes = {recipe_id: [] for recipe_id in recipe_ids}
+        with primary_reads():
+            for recipe_id, ingredient_id in (
+                RecipeIngredient.objects.filter(
+                    recipe_id__in=recipe_ids
+                ).values_list('recipe_id', 'ingredient_id')
+            ):
+                changes[recipe_id].append(ingredient_id)
+        cache.set(
+            MATCH_CHANGES_KEY.format(version=version),
+            changes,
+            MATCH_CHANGES_TIMEOUT,
+        )
+        with self._lock:
+            if not self._loaded:
+                return
+            for recipe_id, ingredient_ids in changes.items():
+                self._apply(recipe_id, ingredient_ids)
+            if self._version == version - 1:
+                self._version = version
+
+    def count_matches(self, ingredient_ids):
+        """Складывает маски ингредиентов в двоичных разрядах.
+
+        Возвращает маски разрядов (младший первым) и объединение масок.
+        """
+        self.ensure_loaded()
+        planes, union = [], 0
+        with self._lock:
+            bitsets = [
+                self._postings.get(ingredient_id, 0)
+                for ingredient_id in set(ingredient_ids)
+            ]
+        for bits in bitsets:
+            union |= bits
+            for index, plane in enumerate(planes):
+                planes[index], bits = plane ^ bits, plane & bits
+                if not bits:
+                    break
+            if bits:
+                planes.append(bits)
+        return planes, union
+
+    def collect(self, planes, union, max_matches, start, stop):
+        """Возвращает срез результатов как (id, совпало, всего).
+
+        Рецепты упорядочены по доле имеющихся ингредиентов, затем по числу
+        совпавших ингредиентов и по убыванию id.
+        """
+        with self._lock:
+            sizes = dict(self._sizes)
+            recipe_ids = self._recipe_ids
+        matched = {}
+        for count in range(1, max_matches + 1):
+            bits = union
+            for index, plane in enumerate(planes):
+                bits &= plane if count >> index & 1 else ~plane
+            if bits:
+                matched[count] = bits
+        groups = sorted(
+            (
+                (count / size, count, size)
+                for count in matched
+                for size in sizes
+                if size >= count
+            ),
+            reverse=True,
+        )
+        results, skip, limit = [], start or 0, stop - (start or 0)
+        for _, count, size in groups:
+            bits = matched[count] & sizes[size]
+            if not bits:
+                continue
+            found = popcount(bits)
+            if skip >= found:
+                skip -= found
+                continue
+            while bits and len(results) < limit:
+                position = bits.bit_length() - 1
+                bits ^= 1 << position
+                if skip:
+                    skip -= 1
+                    continue
+                results.append((recipe_ids[position], count, size))
+            if len(results) == limit:
+                break
+        return results
+
+    def match(self, ingredient_ids):
+        return MatchResults(self, ingredient_ids)
+
+
+recipe_match_index = RecipeMatchIndex()
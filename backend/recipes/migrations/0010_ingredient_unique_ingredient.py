@@ -0,0 +1,55 @@
+# Generated by Django 4.2.13 on 2026-10-17 06:06
+
+from django.db import migrations, models
+
+
+def merge_duplicate_ingredients(apps, schema_editor):
+    Ingredient = apps.get_model('recipes', 'Ingredient')
+    RecipeIngredient = apps.get_model('recipes', 'RecipeIngredient')
+    duplicates = (
+        Ingredient.objects.values('name', 'measurement_unit')
+        .annotate(first_id=models.Min('id'), total=models.Count('id'))
+        .filter(total__gt=1)
+    )
+    for duplicate in duplicates:
+        extra_ids = Ingredient.objects.filter(
+            name=duplicate['name'],
+            measurement_unit=duplicate['measurement_unit'],
+        ).exclude(pk=duplicate['first_id'])
+        recipes_with_first = RecipeIngredient.objects.filter(
+            ingredient_id=duplicate['first_id']
+        ).values('recipe_id')
+        RecipeIngredient.objects.filter(
+            ingredient__in=extra_ids, recipe_id__in=recipes_with_first
+        ).delete()
+        for recipe_ingredient in RecipeIngredient.objects.filter(
+            ingredient__in=extra_ids
+        ).order_by('recipe_id', 'id'):
+            if RecipeIngredient.objects.filter(
+                recipe_id=recipe_ingredient.recipe_id,
+                ingredient_id=duplicate['first_id'],
+            ).exists():
+                recipe_ingredient.delete()
+                continue
+            recipe_ingredient.ingredient_id = duplicate['first_id']
+            recipe_ingredient.save(update_fields=('ingredient',))
+        extra_ids.delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0009_ingredient_name_search_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            merge_duplicate_ingredients, migrations.RunPython.noop
+        ),
+        migrations.AddConstraint(
+            model_name='ingredient',
+            constraint=models.UniqueConstraint(
+                fields=('name', 'measurement_unit'), name='unique_ingredient'
+            ),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.13 on 2026-10-17 06:07
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0010_ingredient_unique_ingredient'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_large',
+            field=models.ImageField(
+                blank=True,
+                upload_to='recipes/thumbnails',
+                verbose_name='Большое изображение',
+            ),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='image_small',
+            field=models.ImageField(
+                blank=True,
+                upload_to='recipes/thumbnails',
+                verbose_name='Миниатюра',
+            ),
+        ),
+    ]
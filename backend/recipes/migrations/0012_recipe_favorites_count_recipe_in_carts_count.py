@@ -0,0 +1,55 @@
+# Generated by Django 4.2.13 on 2026-10-17 06:09
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+COUNTERS = (
+    ('recipes.Favorite', 'recipes.Recipe', 'recipe', 'favorites_count'),
+    ('recipes.ShoppingCart', 'recipes.Recipe', 'recipe', 'in_carts_count'),
+    ('recipes.Recipe', 'users.User', 'author', 'recipes_count'),
+    ('users.Subscription', 'users.User', 'author', 'subscribers_count'),
+)
+
+
+def fill_counters(apps, schema_editor):
+    for counted_label, label, foreign_key, field in COUNTERS:
+        counted_model = apps.get_model(counted_label)
+        total = Coalesce(
+            models.Subquery(
+                counted_model.objects.filter(
+                    **{foreign_key: models.OuterRef('pk')}
+                )
+                .order_by()
+                .values(foreign_key)
+                .annotate(total=models.Count('pk'))
+                .values('total')
+            ),
+            0,
+        )
+        apps.get_model(label).objects.update(**{field: total})
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0011_recipe_image_small_recipe_image_large'),
+        ('users', '0008_user_recipes_count_user_subscribers_count'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='favorites_count',
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name='В избранном'
+            ),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='in_carts_count',
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name='В корзинах'
+            ),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
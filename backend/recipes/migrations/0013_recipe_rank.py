@@ -0,0 +1,70 @@
+# Generated by Django 4.2.13 on 2026-10-17 06:11
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0012_recipe_favorites_count_recipe_in_carts_count'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeRank',
+            fields=[
+                (
+                    'recipe',
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        primary_key=True,
+                        related_name='rank',
+                        serialize=False,
+                        to='recipes.recipe',
+                        verbose_name='Рецепт',
+                    ),
+                ),
+                (
+                    'popular',
+                    models.FloatField(
+                        db_index=True,
+                        default=0,
+                        verbose_name='Популярность',
+                    ),
+                ),
+                (
+                    'trending',
+                    models.FloatField(
+                        db_index=True, default=0, verbose_name='Тренд'
+                    ),
+                ),
+                ('updated', models.DateTimeField(verbose_name='Обновлено')),
+            ],
+            options={
+                'verbose_name': 'рейтинг рецепта',
+                'verbose_name_plural': 'Рейтинги рецептов',
+            },
+        ),
+        migrations.AddField(
+            model_name='favorite',
+            name='created',
+            field=models.DateTimeField(
+                auto_now_add=True,
+                default=django.utils.timezone.now,
+                verbose_name='Добавлено',
+            ),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='shoppingcart',
+            name='created',
+            field=models.DateTimeField(
+                auto_now_add=True,
+                default=django.utils.timezone.now,
+                verbose_name='Добавлено',
+            ),
+            preserve_default=False,
+        ),
+    ]
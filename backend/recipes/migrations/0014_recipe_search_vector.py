@@ -0,0 +1,51 @@
+# Generated by Django 4.2.13 on 2026-10-17 06:13
+
+import django.contrib.postgres.search
+from django.db import migrations
+
+CREATE_STATEMENTS = (
+    'CREATE INDEX IF NOT EXISTS recipes_recipe_search_vector_idx '
+    'ON recipes_recipe USING gin (search_vector)',
+    "UPDATE recipes_recipe AS recipe SET search_vector = "
+    "setweight(to_tsvector('russian', recipe.name), 'A') || "
+    "setweight(to_tsvector('russian', coalesce(("
+    "SELECT string_agg(ingredient.name, ' ') "
+    "FROM recipes_recipeingredient AS recipe_ingredient "
+    "JOIN recipes_ingredient AS ingredient "
+    "ON ingredient.id = recipe_ingredient.ingredient_id "
+    "WHERE recipe_ingredient.recipe_id = recipe.id), '')), 'B') || "
+    "setweight(to_tsvector('russian', recipe.text), 'C')",
+)
+
+DROP_INDEX = ('DROP INDEX IF EXISTS recipes_recipe_search_vector_idx',)
+
+
+def run_on_postgresql(statements):
+    def operation(apps, schema_editor):
+        if schema_editor.connection.vendor != 'postgresql':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0013_recipe_rank'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(
+                editable=False, null=True
+            ),
+        ),
+        migrations.RunPython(
+            run_on_postgresql(CREATE_STATEMENTS),
+            run_on_postgresql(DROP_INDEX),
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 4.2.13 on 2026-10-17 06:30
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+
+
+def copy_short_links(apps, schema_editor):
+    Recipe = apps.get_model('recipes', 'Recipe')
+    LegacyShortLink = apps.get_model('recipes', 'LegacyShortLink')
+    links = (
+        Recipe.objects.exclude(short_link='')
+        .values_list('short_link', 'pk')
+        .iterator(chunk_size=BATCH_SIZE)
+    )
+    batch = []
+    for link, recipe_id in links:
+        batch.append(LegacyShortLink(link=link, recipe_id=recipe_id))
+        if len(batch) == BATCH_SIZE:
+            LegacyShortLink.objects.bulk_create(batch)
+            batch = []
+    LegacyShortLink.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0014_recipe_search_vector'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LegacyShortLink',
+            fields=[
+                (
+                    'link',
+                    models.CharField(
+                        max_length=22,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name='Ссылка',
+                    ),
+                ),
+                (
+                    'recipe',
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name='legacy_short_links',
+                        to='recipes.recipe',
+                        verbose_name='Рецепт',
+                    ),
+                ),
+            ],
+            options={
+                'verbose_name': 'старая короткая ссылка',
+                'verbose_name_plural': 'Старые короткие ссылки',
+            },
+        ),
+        migrations.RunPython(copy_short_links, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='recipe',
+            name='short_link',
+        ),
+    ]
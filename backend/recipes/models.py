@@ -1,7 +1,10 @@
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator
 from django.db import models
-from shortuuidfield.fields import ShortUUIDField
+
+from recipes.shortlinks import encode_short_link
+from users.models import CountersMixin
 
 User = get_user_model()
 
@@ -25,18 +28,67 @@ class Ingredient(models.Model):
     class Meta:
         verbose_name = 'ингредиент'
         verbose_name_plural = 'Ингредиенты'
+        constraints = (
+            models.UniqueConstraint(
+                fields=('name', 'measurement_unit'),
+                name='unique_ingredient',
+            ),
+        )
 
     def __str__(self):
         return self.name
 
 
-class Recipe(models.Model):
+def get_related_lookups():
+    return (
+        'tags',
+        models.Prefetch(
+            'recipeingredient_set',
+            queryset=RecipeIngredient.objects.select_related('ingredient'),
+        ),
+    )
+
+
+class RecipeQuerySet(models.QuerySet):
+
+    def with_user_flags(self, user):
+        queryset = self.prefetch_related(
+            models.Prefetch(
+                'author', queryset=User.objects.with_is_subscribed(user)
+            )
+        )
+        if not user.is_authenticated:
+            return queryset.annotate(
+                is_favorited=models.Value(False),
+                is_in_shopping_cart=models.Value(False),
+            )
+        return queryset.annotate(
+            is_favorited=models.Exists(
+                Favorite.objects.filter(
+                    user=user, recipe=models.OuterRef('pk')
+                )
+            ),
+            is_in_shopping_cart=models.Exists(
+                ShoppingCart.objects.filter(
+                    user=user, recipe=models.OuterRef('pk')
+                )
+            ),
+        )
+
+
+class Recipe(CountersMixin, models.Model):
     name = models.CharField('Название', max_length=256)
     text = models.TextField('Описание')
     cooking_time = models.PositiveSmallIntegerField(
         'Время приготовления', validators=(MinValueValidator(1),)
     )
     image = models.ImageField('Изображение', upload_to='recipes/images')
+    image_small = models.ImageField(
+        'Миниатюра', upload_to='recipes/thumbnails', blank=True
+    )
+    image_large = models.ImageField(
+        'Большое изображение', upload_to='recipes/thumbnails', blank=True
+    )
     tags = models.ManyToManyField(Tag, verbose_name='Теги')
     ingredients = models.ManyToManyField(
         Ingredient, through='RecipeIngredient'
@@ -47,7 +99,17 @@ class Recipe(models.Model):
         related_name='recipes',
         verbose_name='Автор',
     )
-    short_link = ShortUUIDField('Короткая ссылка', unique=True)
+    favorites_count = models.PositiveIntegerField(
+        'В избранном', default=0, editable=False
+    )
+    in_carts_count = models.PositiveIntegerField(
+        'В корзинах', default=0, editable=False
+    )
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    objects = RecipeQuerySet.as_manager()
+
+    COUNTER_FIELDS = ('favorites_count', 'in_carts_count')
 
     class Meta:
         verbose_name = 'рецепт'
@@ -57,6 +119,29 @@ class Recipe(models.Model):
     def __str__(self):
         return self.name
 
+    @property
+    def short_link(self):
+        return encode_short_link(self.pk)
+
+
+class LegacyShortLink(models.Model):
+    """Короткие ссылки старого формата, выданные до перехода на id."""
+
+    link = models.CharField('Ссылка', max_length=22, primary_key=True)
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name='legacy_short_links',
+        verbose_name='Рецепт',
+    )
+
+    class Meta:
+        verbose_name = 'старая короткая ссылка'
+        verbose_name_plural = 'Старые короткие ссылки'
+
+    def __str__(self):
+        return self.link
+
 
 class RecipeIngredient(models.Model):
     recipe = models.ForeignKey(
@@ -98,6 +183,7 @@ class BaseUserRecipeModel(models.Model):
         related_name='%(class)ss',
         verbose_name='Рецепт',
     )
+    created = models.DateTimeField('Добавлено', auto_now_add=True)
 
     class Meta:
         abstract = True
@@ -120,3 +206,23 @@ class ShoppingCart(BaseUserRecipeModel):
     class Meta(BaseUserRecipeModel.Meta):
         verbose_name = 'корзину'
         verbose_name_plural = 'Корзины'
+
+
+class RecipeRank(models.Model):
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='rank',
+        verbose_name='Рецепт',
+    )
+    popular = models.FloatField('Популярность', default=0, db_index=True)
+    trending = models.FloatField('Тренд', default=0, db_index=True)
+    updated = models.DateTimeField('Обновлено')
+
+    class Meta:
+        verbose_name = 'рейтинг рецепта'
+        verbose_name_plural = 'Рейтинги рецептов'
+
+    def __str__(self):
+        return f'Рейтинг рецепта {self.recipe_id}'
@@ -0,0 +1,81 @@
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F, Max
+from django.utils import timezone
+
+from recipes.models import Favorite, RecipeRank, ShoppingCart
+
+HALF_LIVES = {
+    'popular': timedelta(days=30),
+    'trending': timedelta(days=3),
+}
+EVENT_MODELS = (Favorite, ShoppingCart)
+# Время created ставится при вставке, а видно событие становится после
+# фиксации транзакции. Окно событий отстаёт от момента обновления на это
+# время, чтобы события из долгих транзакций не выпадали из подсчёта.
+COMMIT_DELAY = timedelta(minutes=5)
+
+
+def decay(age, half_life):
+    return 0.5 ** (age / half_life)
+
+
+def refresh_ranks(full=False):
+    """Обновляет таблицу рейтингов рецептов.
+
+    Каждое добавление в избранное или корзину весит единицу и затухает
+    вдвое за период полураспада. Поэтому при обычном обновлении старые
+    рейтинги умножаются на общий множитель, а суммируются только события
+    из окна между прошлым и текущим обновлением, сдвинутого назад на
+    COMMIT_DELAY. Удаления из избранного и корзины учитываются только при
+    полном пересчёте (full=True).
+
+    Возвращает количество рецептов, рейтинг которых вырос.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        if full:
+            RecipeRank.objects.all().delete()
+            since = None
+        else:
+            since = RecipeRank.objects.aggregate(since=Max('updated'))['since']
+        if since is not None:
+            RecipeRank.objects.update(
+                updated=now,
+                **{
+                    field: F(field) * decay(now - since, half_life)
+                    for field, half_life in HALF_LIVES.items()
+                },
+            )
+
+        scores = defaultdict(lambda: dict.fromkeys(HALF_LIVES, 0.0))
+        for model in EVENT_MODELS:
+            events = model.objects.filter(created__lte=now - COMMIT_DELAY)
+            if since is not None:
+                events = events.filter(created__gt=since - COMMIT_DELAY)
+            for recipe_id, created in events.values_list(
+                'recipe_id', 'created'
+            ).iterator():
+                for field, half_life in HALF_LIVES.items():
+                    scores[recipe_id][field] += decay(now - created, half_life)
+        if not scores:
+            return 0
+
+        ranks = RecipeRank.objects.in_bulk(scores)
+        new_ranks = []
+        for recipe_id, recipe_scores in scores.items():
+            rank = ranks.get(recipe_id)
+            if rank is None:
+                new_ranks.append(
+                    RecipeRank(
+                        recipe_id=recipe_id, updated=now, **recipe_scores
+                    )
+                )
+                continue
+            for field, score in recipe_scores.items():
+                setattr(rank, field, getattr(rank, field) + score)
+        RecipeRank.objects.bulk_update(ranks.values(), tuple(HALF_LIVES))
+        RecipeRank.objects.bulk_create(new_ranks)
+    return len(scores)
@@ -0,0 +1,174 @@
+import re
+from bisect import bisect_left
+from collections import defaultdict
+from threading import Lock
+
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVector)
+from django.db import connection
+from django.db.models import (Case, F, FloatField, OuterRef, Subquery,
+                              TextField, Value, When)
+from django.db.models.functions import Coalesce
+
+from recipes.models import Recipe, RecipeIngredient
+
+SEARCH_CONFIG = 'russian'
+# Веса частей рецепта совпадают с весами A, B и C в ts_rank PostgreSQL.
+WEIGHTS = {'name': 1.0, 'ingredients': 0.4, 'text': 0.2}
+TOKEN_PATTERN = re.compile(r'\w+')
+
+
+def tokenize(value):
+    return TOKEN_PATTERN.findall(value.casefold())
+
+
+def get_search_vector():
+    ingredients = (
+        RecipeIngredient.objects.filter(recipe=OuterRef('pk'))
+        .order_by()
+        .values('recipe')
+        .annotate(names=StringAgg('ingredient__name', ' '))
+        .values('names')
+    )
+    return (
+        SearchVector('name', weight='A', config=SEARCH_CONFIG)
+        + SearchVector(
+            Coalesce(
+                Subquery(ingredients), Value(''), output_field=TextField()
+            ),
+            weight='B',
+            config=SEARCH_CONFIG,
+        )
+        + SearchVector('text', weight='C', config=SEARCH_CONFIG)
+    )
+
+
+class RecipeSearchIndex:
+    """Инвертированный индекс рецептов в памяти процесса.
+
+    Используется вместо tsvector, когда база данных не PostgreSQL,
+    например при локальных запусках на SQLite. Слово запроса совпадает
+    со всеми словами индекса, которые с него начинаются.
+    """
+
+    def __init__(self):
+        self._lock = Lock()
+        self._postings = None
+        self._recipe_tokens = {}
+        self._vocabulary = None
+
+    def load(self):
+        postings = defaultdict(dict)
+        self._postings, self._recipe_tokens = postings, {}
+        ingredients = defaultdict(list)
+        for recipe_id, name in RecipeIngredient.objects.values_list(
+            'recipe_id', 'ingredient__name'
+        ).iterator():
+            ingredients[recipe_id].append(name)
+        for recipe in Recipe.objects.values('id', 'name', 'text').iterator():
+            recipe['ingredients'] = ' '.join(ingredients[recipe['id']])
+            self._add(recipe)
+
+    def _add(self, recipe):
+        scores = defaultdict(float)
+        for field, weight in WEIGHTS.items():
+            for token in tokenize(recipe[field]):
+                scores[token] += weight
+        for token in self._recipe_tokens.pop(recipe['id'], ()):
+            del self._postings[token][recipe['id']]
+        for token, score in scores.items():
+            self._postings[token][recipe['id']] = score
+        self._recipe_tokens[recipe['id']] = tuple(scores)
+        self._vocabulary = None
+
+    def add(self, recipe):
+        with self._lock:
+            if self._postings is None:
+                return
+            self._add(
+                {
+                    'id': recipe.id,
+                    'name': recipe.name,
+                    'text': recipe.text,
+                    'ingredients': ' '.join(
+                        recipe.ingredients.values_list('name', flat=True)
+                    ),
+                }
+            )
+
+    def search(self, query):
+        """Возвращает словарь {id рецепта: релевантность}."""
+        with self._lock:
+            if self._postings is None:
+                self.load()
+            if self._vocabulary is None:
+                self._vocabulary = sorted(
+                    token for token, recipes in self._postings.items()
+                    if recipes
+                )
+            results = None
+            for term in tokenize(query):
+                matches = defaultdict(float)
+                position = bisect_left(self._vocabulary, term)
+                for token in self._vocabulary[position:]:
+                    if not token.startswith(term):
+                        break
+                    for recipe_id, score in self._postings[token].items():
+                        matches[recipe_id] += score
+                if results is None:
+                    results = matches
+                    continue
+                results = {
+                    recipe_id: score + matches[recipe_id]
+                    for recipe_id, score in results.items()
+                    if recipe_id in matches
+                }
+            return results or {}
+
+
+recipe_search_index = RecipeSearchIndex()
+
+
+def update_search_vector(recipe):
+    update_search_vectors((recipe,))
+
+
+def update_search_vectors(recipes):
+    if connection.vendor == 'postgresql':
+        Recipe.objects.filter(
+            pk__in=[recipe.pk for recipe in recipes]
+        ).update(search_vector=get_search_vector())
+        return
+    for recipe in recipes:
+        recipe_search_index.add(recipe)
+
+
+def search_recipes(queryset, query):
+    """Фильтрует рецепты по тексту и сортирует их по релевантности."""
+    if connection.vendor == 'postgresql':
+        search_query = SearchQuery(
+            query, config=SEARCH_CONFIG, search_type='websearch'
+        )
+        return (
+            queryset.filter(search_vector=search_query)
+            .annotate(
+                search_rank=SearchRank(F('search_vector'), search_query)
+            )
+            .order_by('-search_rank', '-id')
+        )
+    scores = recipe_search_index.search(query)
+    return (
+        queryset.filter(pk__in=scores)
+        .annotate(
+            search_rank=Case(
+                *(
+                    When(pk=recipe_id, then=Value(score))
+                    for recipe_id, score in scores.items()
+                ),
+                default=Value(0.0),
+                output_field=FloatField(),
+            )
+        )
+        .order_by('-search_rank', '-id')
+    )
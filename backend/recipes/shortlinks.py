@@ -0,0 +1,80 @@
+import hmac
+from hashlib import sha256
+
+from django.conf import settings
+
+ALPHABET = (
+    '0123456789'
+    'abcdefghijklmnopqrstuvwxyz'
+    'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+)
+ALPHABET_INDEX = {char: index for index, char in enumerate(ALPHABET)}
+HALF_BITS = 24
+HALF_MASK = (1 << HALF_BITS) - 1
+MAX_PK = (1 << 2 * HALF_BITS) - 1
+FEISTEL_ROUNDS = 4
+MAX_LINK_LENGTH = 9
+
+
+def round_function(key, round_index, half):
+    digest = hmac.new(
+        key, bytes((round_index,)) + half.to_bytes(3, 'big'), sha256
+    ).digest()
+    return int.from_bytes(digest[:3], 'big')
+
+
+def permute(value, inverse=False):
+    """Переставляет 48-битные числа сетью Фейстеля с ключом.
+
+    Без SHORT_LINK_SECRET перестановка тождественная, и ссылки идут
+    по порядку id.
+    """
+    if not settings.SHORT_LINK_SECRET:
+        return value
+    key = settings.SHORT_LINK_SECRET.encode()
+    left, right = value >> HALF_BITS, value & HALF_MASK
+    if inverse:
+        for round_index in reversed(range(FEISTEL_ROUNDS)):
+            left, right = (
+                right ^ round_function(key, round_index, left), left
+            )
+    else:
+        for round_index in range(FEISTEL_ROUNDS):
+            left, right = (
+                right, left ^ round_function(key, round_index, right)
+            )
+    return left << HALF_BITS | right
+
+
+def encode_short_link(pk):
+    if not 0 < pk <= MAX_PK:
+        raise ValueError(f'id {pk} не помещается в короткую ссылку.')
+    value = permute(pk)
+    chars = []
+    while True:
+        value, index = divmod(value, len(ALPHABET))
+        chars.append(ALPHABET[index])
+        if not value:
+            return ''.join(reversed(chars))
+
+
+def decode_short_link(link):
+    """Возвращает id рецепта или None, если ссылка не в новом формате.
+
+    Ссылки с ведущими нулями не принимаются, чтобы у рецепта была
+    ровно одна ссылка.
+    """
+    if not 0 < len(link) <= MAX_LINK_LENGTH:
+        return None
+    if link[0] == '0' and len(link) > 1:
+        return None
+    value = 0
+    for char in link:
+        index = ALPHABET_INDEX.get(char)
+        if index is None:
+            return None
+        value = value * len(ALPHABET) + index
+    if value > MAX_PK:
+        return None
+    pk = permute(value, inverse=True)
+    return pk or None
@@ -0,0 +1,37 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from recipes.counters import update_counter
+from recipes.matching import recipe_match_index
+from recipes.models import Favorite, Recipe, RecipeIngredient, ShoppingCart
+from users.models import Subscription
+
+catalog_imported = Signal()
+thumbnails_created = Signal()
+
+
+@receiver(post_save, sender=Favorite)
+@receiver(post_save, sender=ShoppingCart)
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Subscription)
+def increment_counter(sender, instance, created, **kwargs):
+    if created:
+        update_counter(sender, instance, 1)
+
+
+@receiver(post_delete, sender=Favorite)
+@receiver(post_delete, sender=ShoppingCart)
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Subscription)
+def decrement_counter(sender, instance, **kwargs):
+    update_counter(sender, instance, -1)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    recipe_match_index.schedule(instance.pk)
+
+
+@receiver((post_save, post_delete), sender=RecipeIngredient)
+def recipe_ingredient_changed(sender, instance, **kwargs):
+    recipe_match_index.schedule(instance.recipe_id)
@@ -0,0 +1,53 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from recipes.models import Tag
+
+
+class LoadInitialDataTests(TestCase):
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        os.mkdir(os.path.join(directory, 'data'))
+        self.tags_path = os.path.join(directory, 'data', 'tags.csv')
+        cwd = os.getcwd()
+        os.chdir(directory)
+        self.addCleanup(os.chdir, cwd)
+        Tag.objects.create(name='Завтрак', slug='breakfast')
+
+    def load_tags(self, *rows):
+        with open(self.tags_path, 'w', encoding='utf-8') as file:
+            file.writelines(f'{name},{slug}\n' for name, slug in rows)
+        call_command(
+            'load_initial_data',
+            format='csv',
+            stdout=StringIO(),
+            stderr=StringIO(),
+        )
+
+    def test_names_are_updated_by_slug(self):
+        self.load_tags(('Утро', 'breakfast'), ('Обед', 'lunch'))
+        self.assertEqual(
+            dict(Tag.objects.values_list('slug', 'name')),
+            {'breakfast': 'Утро', 'lunch': 'Обед'},
+        )
+
+    def test_name_taken_by_other_slug_is_rejected(self):
+        for rows in (
+            (('Обед', 'lunch'), ('Завтрак', 'morning')),
+            (('Обед', 'lunch'), ('Обед', 'dinner')),
+            (('Обед', 'lunch'), ('Ужин', 'lunch')),
+        ):
+            with self.subTest(rows=rows):
+                with self.assertRaises(CommandError):
+                    self.load_tags(*rows)
+                self.assertEqual(
+                    list(Tag.objects.values_list('slug', flat=True)),
+                    ['breakfast'],
+                )
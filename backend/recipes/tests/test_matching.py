@@ -0,0 +1,96 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.test import TestCase
+
+from recipes.matching import (RecipeMatchIndex, get_match_version,
+                              recipe_match_index)
+from recipes.models import Ingredient, Recipe, RecipeIngredient
+
+User = get_user_model()
+
+
+class RecipeMatchIndexTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', email='author@example.com', password='password'
+        )
+        cls.ingredients = [
+            Ingredient.objects.create(
+                name=f'Продукт {index}', measurement_unit='г'
+            )
+            for index in range(4)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        recipe_match_index.ensure_loaded()
+
+    def create_recipe(self, ingredients):
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe = Recipe.objects.create(
+                author=self.author,
+                name='Рецепт',
+                text='Описание',
+                cooking_time=10,
+                image=ContentFile(b'image', name='image.webp'),
+            )
+            RecipeIngredient.objects.bulk_create(
+                RecipeIngredient(
+                    recipe=recipe, ingredient=ingredient, amount=1
+                )
+                for ingredient in ingredients
+            )
+            recipe_match_index.schedule(recipe.pk)
+        return recipe
+
+    def match(self, index, ingredients):
+        results = index.match([ingredient.pk for ingredient in ingredients])
+        return [recipe_id for recipe_id, _, _ in results[0:10]]
+
+    def test_transaction_changes_are_applied_once(self):
+        recipe = self.create_recipe(self.ingredients[:3])
+        version = get_match_version()
+        with self.captureOnCommitCallbacks() as callbacks:
+            recipe.delete()
+        # По вызову на каждую удалённую строку, но изменения применяются
+        # первым вызовом одним запросом и одной версией.
+        flushes = [
+            callback for callback in callbacks
+            if callback == recipe_match_index.flush
+        ]
+        self.assertEqual(len(flushes), 4)
+        with self.assertNumQueries(1):
+            for callback in flushes:
+                callback()
+        self.assertEqual(get_match_version(), version + 1)
+        self.assertEqual(self.match(recipe_match_index, self.ingredients), [])
+
+    def test_other_process_replays_changes(self):
+        other = RecipeMatchIndex()
+        other.ensure_loaded()
+        first = self.create_recipe(self.ingredients[:2])
+        second = self.create_recipe(self.ingredients[1:3])
+        with self.captureOnCommitCallbacks(execute=True):
+            RecipeIngredient.objects.filter(
+                recipe=first, ingredient=self.ingredients[0]
+            ).delete()
+
+        with self.assertNumQueries(0):
+            other.ensure_loaded()
+        for index in (recipe_match_index, other):
+            self.assertEqual(self.match(index, self.ingredients[:1]), [])
+            self.assertEqual(
+                self.match(index, self.ingredients[1:2]),
+                [first.pk, second.pk],
+            )
+
+    def test_missing_changes_reload_the_index(self):
+        other = RecipeMatchIndex()
+        other.ensure_loaded()
+        recipe = self.create_recipe(self.ingredients[:1])
+        cache.delete(f'recipe_match_changes:{get_match_version()}')
+        other.ensure_loaded()
+        self.assertEqual(self.match(other, self.ingredients[:1]), [recipe.pk])
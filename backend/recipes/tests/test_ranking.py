@@ -0,0 +1,52 @@
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.db.models import F
+from django.test import TestCase
+from django.utils import timezone
+
+from recipes.models import Favorite, Recipe, RecipeRank
+from recipes.ranking import refresh_ranks
+
+User = get_user_model()
+
+
+class RefreshRanksTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', email='author@example.com', password='password'
+        )
+        cls.recipes = [
+            Recipe.objects.create(
+                author=cls.author,
+                name=f'Рецепт {index}',
+                text='Описание',
+                cooking_time=10,
+                image=ContentFile(b'image', name='image.webp'),
+            )
+            for index in range(2)
+        ]
+
+    def add_favorite(self, recipe, created):
+        favorite = Favorite.objects.create(user=self.author, recipe=recipe)
+        Favorite.objects.filter(pk=favorite.pk).update(created=created)
+
+    def test_late_committed_events_are_counted_once(self):
+        self.add_favorite(
+            self.recipes[0], timezone.now() - timedelta(hours=1)
+        )
+        self.assertEqual(refresh_ranks(), 1)
+        # Прошлое обновление было 20 минут назад, а событие создано
+        # незадолго до него, но зафиксировано после.
+        RecipeRank.objects.update(updated=F('updated') - timedelta(minutes=20))
+        since = RecipeRank.objects.get().updated
+        self.add_favorite(self.recipes[1], since - timedelta(minutes=1))
+
+        self.assertEqual(refresh_ranks(), 1)
+        self.assertGreater(
+            RecipeRank.objects.get(recipe=self.recipes[1]).popular, 0.99
+        )
+        self.assertEqual(refresh_ranks(), 0)
@@ -0,0 +1,106 @@
+import base64
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.db import connection
+from django.db.models.sql.subqueries import UpdateQuery
+from django.db.utils import load_backend
+from django.test import SimpleTestCase, TestCase, override_settings
+from PIL import Image
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from recipes.search import get_search_vector, recipe_search_index
+
+User = get_user_model()
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+
+class SearchVectorTests(SimpleTestCase):
+
+    def test_postgresql_update_compiles(self):
+        backend = load_backend('django.db.backends.postgresql')
+        postgresql = backend.DatabaseWrapper(
+            connection.settings_dict
+            | {'ENGINE': 'django.db.backends.postgresql'},
+            'postgresql',
+        )
+        query = Recipe.objects.filter(pk__in=[1]).query.chain(UpdateQuery)
+        query.add_update_values({'search_vector': get_search_vector()})
+        sql, _ = query.get_compiler(connection=postgresql).as_sql()
+        self.assertIn('to_tsvector', sql)
+        self.assertIn('STRING_AGG', sql)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT)
+class RecipeSearchIndexTests(TestCase):
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            username='author', email='author@example.com', password='password'
+        )
+        cls.tag = Tag.objects.create(name='Обед', slug='lunch')
+        cls.flour = Ingredient.objects.create(
+            name='мука', measurement_unit='г'
+        )
+        cls.milk = Ingredient.objects.create(
+            name='молоко', measurement_unit='мл'
+        )
+        cls.soup = Recipe.objects.create(
+            author=cls.user,
+            name='Молочный суп',
+            text='Сварить.',
+            cooking_time=15,
+            image=ContentFile(b'image', name='image.webp'),
+        )
+        RecipeIngredient.objects.create(
+            recipe=cls.soup, ingredient=cls.milk, amount=500
+        )
+
+    def setUp(self):
+        cache.clear()
+        recipe_search_index.load()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def search(self, query):
+        response = self.client.get('/api/recipes/', {'search': query})
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.json()['results']]
+
+    def test_created_recipe_is_found_by_ingredient(self):
+        buffer = BytesIO()
+        Image.new('RGB', (10, 10), 'red').save(buffer, 'PNG')
+        response = self.client.post(
+            '/api/recipes/',
+            {
+                'name': 'Блины',
+                'text': 'Смешать молоко и муку.',
+                'cooking_time': 20,
+                'image': 'data:image/png;base64,'
+                + base64.b64encode(buffer.getvalue()).decode(),
+                'tags': [self.tag.id],
+                'ingredients': [{'id': self.flour.id, 'amount': 200}],
+            },
+            format='json',
+        )
+        self.assertEqual(response.status_code, 201, response.json())
+        pancakes = response.json()['id']
+
+        self.assertEqual(self.search('мук'), [pancakes])
+        self.assertEqual(self.search('молоч'), [self.soup.id])
+        # Совпадение в ингредиентах весит больше, чем в описании.
+        self.assertEqual(self.search('молок'), [self.soup.id, pancakes])
+        self.assertEqual(self.search('блины мука'), [pancakes])
+        self.assertEqual(self.search('пицца'), [])
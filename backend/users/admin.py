@@ -8,7 +8,14 @@ User = get_user_model()
 
 @admin.register(User)
 class UserAdmin(admin.ModelAdmin):
-    list_display = ('username', 'email', 'first_name', 'last_name')
+    list_display = (
+        'username',
+        'email',
+        'first_name',
+        'last_name',
+        'recipes_count',
+        'subscribers_count',
+    )
     search_fields = ('email', 'username')
 
 
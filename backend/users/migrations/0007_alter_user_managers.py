@@ -0,0 +1,21 @@
+# Generated by Django 4.2.13 on 2026-10-17 05:58
+
+from django.db import migrations
+
+import users.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0006_alter_subscription_options'),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name='user',
+            managers=[
+                ('objects', users.models.FoodgramUserManager()),
+            ],
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 4.2.13 on 2026-10-17 06:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0007_alter_user_managers'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='recipes_count',
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name='Рецептов'
+            ),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='subscribers_count',
+            field=models.PositiveIntegerField(
+                default=0, editable=False, verbose_name='Подписчиков'
+            ),
+        ),
+    ]
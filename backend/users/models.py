@@ -1,12 +1,66 @@
-from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import AbstractUser, UserManager
 from django.db import models
 
 
-class User(AbstractUser):
+class UserQuerySet(models.QuerySet):
+
+    def with_is_subscribed(self, user):
+        if not user.is_authenticated:
+            return self.annotate(is_subscribed=models.Value(False))
+        return self.annotate(
+            is_subscribed=models.Exists(
+                Subscription.objects.filter(
+                    user=user, author=models.OuterRef('pk')
+                )
+            )
+        )
+
+
+class FoodgramUserManager(UserManager.from_queryset(UserQuerySet)):
+    pass
+
+
+class CountersMixin:
+    """Не перезаписывает счётчики при сохранении существующего объекта.
+
+    Счётчики меняются только запросами UPDATE с F(), а в памяти объекта
+    они могут устареть, поэтому save() без update_fields сохраняет все
+    поля, кроме COUNTER_FIELDS.
+    """
+
+    COUNTER_FIELDS = ()
+
+    def save(self, *args, **kwargs):
+        if (
+            not self._state.adding
+            and not args
+            and kwargs.get('update_fields') is None
+            and not kwargs.get('force_insert')
+        ):
+            kwargs['update_fields'] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
+
+class User(CountersMixin, AbstractUser):
     email = models.EmailField('Адрес электронной почты', unique=True)
     first_name = models.CharField('Имя', max_length=150)
     last_name = models.CharField('Фамилия', max_length=150)
     avatar = models.ImageField('Аватар', upload_to='users')
+    recipes_count = models.PositiveIntegerField(
+        'Рецептов', default=0, editable=False
+    )
+    subscribers_count = models.PositiveIntegerField(
+        'Подписчиков', default=0, editable=False
+    )
+
+    objects = FoodgramUserManager()
+
+    COUNTER_FIELDS = ('recipes_count', 'subscribers_count')
 
 
 class Subscription(models.Model):